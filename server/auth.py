@@ -1,19 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from typing import Literal, Optional
 import logging
 
-from server import database, models
+from server import database, hashing, models
 from server.jwt_utils import create_access_token, decode_access_token, refresh_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 token scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -36,13 +34,26 @@ class TokenRequest(BaseModel):
     token: str
 
 
+class BulkUserAction(BaseModel):
+    action: Literal["approve", "reject"]
+    user_ids: list[int] = Field(min_length=1, max_length=500)
+
+
+BULK_STATUS = {"approve": "approved", "reject": "rejected"}
+
+
 # -------- Helpers --------
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_user_by_email(db: AsyncSession, email: str) -> models.User | None:
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
     payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = db.query(models.User).filter(models.User.email == payload.get("sub")).first()
+    user = await get_user_by_email(db, payload.get("sub"))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
@@ -54,24 +65,26 @@ def require_admin(user: models.User = Depends(get_current_user)):
     return user
 
 
-def log_action(db: Session, user_id: int, action: str):
+async def log_action(db: AsyncSession, user_id: int, action: str, commit: bool = True):
+    """Add an audit row; pass commit=False to make it part of the caller's transaction."""
     log = models.AuditLog(user_id=user_id, action=action, timestamp=datetime.utcnow())
     db.add(log)
-    db.commit()
+    if commit:
+        await db.commit()
 
 
 # -------- Endpoints --------
 @router.post("/signup")
-def signup(user: UserSignup, db: Session = Depends(database.get_db)):
+async def signup(user: UserSignup, db: AsyncSession = Depends(database.get_async_db)):
     try:
-        existing_user = db.query(models.User).filter(models.User.email == user.email).first()
+        existing_user = await get_user_by_email(db, user.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered. Please log in."
             )
 
-        hashed_pw = pwd_context.hash(user.password)
+        hashed_pw = await hashing.hash_password(user.password)
 
         new_user = models.User(
             email=user.email,
@@ -80,8 +93,8 @@ def signup(user: UserSignup, db: Session = Depends(database.get_db)):
             status="pending"
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         return {
             "id": new_user.id,
@@ -96,7 +109,7 @@ def signup(user: UserSignup, db: Session = Depends(database.get_db)):
         raise
     except Exception as e:
         logger.error(f"Signup failed for {user.email}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Signup failed due to server error. Please try again."
@@ -104,20 +117,26 @@ def signup(user: UserSignup, db: Session = Depends(database.get_db)):
 
 
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(database.get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(database.get_async_db)):
     try:
-        db_user = db.query(models.User).filter(models.User.email == user.email).first()
+        db_user = await get_user_by_email(db, user.email)
         if not db_user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
         try:
-            valid = pwd_context.verify(user.password, db_user.password_hash)
+            valid, new_hash = await hashing.verify_password(user.password, db_user.password_hash)
+        except HTTPException:
+            raise
         except Exception:
             raise HTTPException(status_code=500, detail="Password verification error")
 
         if not valid:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+        # Cost factor changed since this hash was created → store the upgraded hash
+        if new_hash:
+            db_user.password_hash = new_hash
+
         token_data = {
             "sub": db_user.email,
             "role": db_user.role,
@@ -126,7 +145,7 @@ def login(user: UserLogin, db: Session = Depends(database.get_db)):
 
         access_token = create_access_token(token_data)
 
-        log_action(db, db_user.id, "login")
+        await log_action(db, db_user.id, "login")
 
         return {
             "access_token": access_token,
@@ -160,24 +179,83 @@ def me(current_user: models.User = Depends(get_current_user)):
 
 
 @router.post("/approve/{user_id}")
-def approve_user(
+async def approve_user(
     user_id: int,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     admin_user: models.User = Depends(require_admin)
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     user.status = "approved"
-    db.commit()
-    db.refresh(user)
-
-    log_action(db, admin_user.id, f"approved user {user.email}")
+    await log_action(db, admin_user.id, f"approved user {user.email}", commit=False)
+    await db.commit()  # status change + audit row in one transaction
 
     return {"message": f"User {user.email} approved", "id": user.id}
 
 
+@router.post("/users/bulk")
+async def bulk_user_action(
+    body: BulkUserAction,
+    db: AsyncSession = Depends(database.get_async_db),
+    admin_user: models.User = Depends(require_admin)
+):
+    """Approve / reject many users: one status UPDATE + one audit INSERT, committed together."""
+    new_status = BULK_STATUS[body.action]
+    ids = sorted(set(body.user_ids))
+    rows = (await db.execute(
+        select(models.User.id, models.User.email, models.User.status).where(models.User.id.in_(ids))
+    )).all()
+
+    changed = [row for row in rows if row.status != new_status]
+    if changed:
+        now = datetime.utcnow()
+        await db.execute(
+            update(models.User)
+            .where(models.User.id.in_([row.id for row in changed]))
+            .values(status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(insert(models.AuditLog), [
+            {"user_id": admin_user.id, "action": f"{new_status} user {row.email}", "timestamp": now}
+            for row in changed
+        ])
+        await db.commit()
+
+    found = {row.id for row in rows}
+    return {
+        "action": body.action,
+        "status": new_status,
+        "updated": [row.id for row in changed],
+        "unchanged": sorted(found - {row.id for row in changed}),
+        "not_found": [user_id for user_id in ids if user_id not in found],
+    }
+
+
+@router.get("/users")
+async def list_users(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(database.get_async_db),
+    admin_user: models.User = Depends(require_admin)
+):
+    """Users by ascending id, keyset-paginated (`after_id` = previous `next_cursor`), optionally by status."""
+    query = select(
+        models.User.id, models.User.email, models.User.role, models.User.status, models.User.created_at
+    ).where(models.User.id > after_id)
+    if status_filter:
+        query = query.where(models.User.status == status_filter)  # seeks on ix_users_status_id
+    rows = (await db.execute(query.order_by(models.User.id).limit(limit + 1))).all()
+
+    page = rows[:limit]
+    return {
+        "users": [dict(row._mapping) for row in page],
+        "next_cursor": page[-1].id if len(rows) > limit else None,
+    }
+
+
 @router.post("/refresh")
 def refresh_token(body: TokenRequest):
     try:
@@ -189,11 +267,11 @@ def refresh_token(body: TokenRequest):
         logger.error(f"Token refresh failed: {e}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
 @router.post("/check-email")
-def check_email(email: EmailStr = Depends(), db: Session = Depends(database.get_db)):
+async def check_email(email: EmailStr, db: AsyncSession = Depends(database.get_async_db)):
     """
     Check if the email exists in the database, allowing pending users to access the DevBot demo.
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await get_user_by_email(db, email)
     
     if user:
         return {"exists": True}  # Email exists
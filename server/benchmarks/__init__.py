@@ -0,0 +1,7 @@
+"""
+Benchmarks for the AI Dev Federation Dashboard backend.
+
+Each module is a standalone script, e.g.:
+
+    python -m server.benchmarks.audit_logs --rows 10000000
+"""
@@ -0,0 +1,177 @@
+"""
+audit_logs.py — Audit Log Query Benchmark
+=========================================
+
+Compares the legacy `audit_logs` layout (single heap, no secondary indexes)
+against the monthly-partitioned, indexed layout from the
+`partition_audit_logs` migration, at a configurable row count (default 10M).
+
+Runs against PostgreSQL in an isolated `bench_audit` schema:
+
+    BENCH_DATABASE_URL=postgresql://... python -m server.benchmarks.audit_logs --rows 10000000
+
+Reported queries:
+- guest rate limit  (SecurityMiddleware: guest TASK_* rows in the last minute)
+- user history      (admin view: latest 50 rows for one user)
+- action last day   (admin view: count of one action over 24h)
+- retention         (DELETE older than 6 months vs. DETACH + DROP partitions)
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+SCHEMA = "bench_audit"
+MONTHS = 12
+
+QUERIES = {
+    "guest rate limit": """
+        SELECT COUNT(*) FROM {table}
+        WHERE user_id IS NULL AND timestamp >= now() - interval '1 minute' AND action LIKE 'TASK_%'
+    """,
+    "user history": """
+        SELECT id, action, timestamp FROM {table}
+        WHERE user_id = 42 ORDER BY timestamp DESC LIMIT 50
+    """,
+    "action last day": """
+        SELECT COUNT(*) FROM {table}
+        WHERE action = 'login' AND timestamp >= now() - interval '1 day'
+    """,
+}
+
+# ----------------------------------------------------
+# Setup
+# ----------------------------------------------------
+def setup(conn, rows: int):
+    # Deferred: server.config validates the environment on import (main() fills it in first)
+    from server.retention import _add_months, _month_start
+
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.flat (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER,
+            action VARCHAR NOT NULL,
+            timestamp TIMESTAMP
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.partitioned (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+            user_id INTEGER,
+            action VARCHAR NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """))
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.partitioned_default PARTITION OF {SCHEMA}.partitioned DEFAULT"))
+
+    this_month = _month_start(datetime.utcnow())
+    for offset in range(-MONTHS, 2):
+        month = _add_months(this_month, offset)
+        upper = _add_months(month, 1)
+        conn.execute(text(
+            f"CREATE TABLE {SCHEMA}.partitioned_y{month:%Y}m{month:%m} PARTITION OF {SCHEMA}.partitioned "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+        ))
+
+    # ~20% guest rows, spread uniformly over the last year
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.flat (user_id, action, timestamp)
+        SELECT
+            CASE WHEN random() < 0.2 THEN NULL ELSE (random() * 10000)::int END,
+            (ARRAY['GET /tasks/1', 'POST /tasks/run/file', 'TASK_RUN', 'login', 'GET /repo/tree'])
+                [1 + floor(random() * 5)::int],
+            now() - random() * interval '{MONTHS * 30} days'
+        FROM generate_series(1, :rows)
+    """), {"rows": rows})
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.partitioned (user_id, action, timestamp)
+        SELECT user_id, action, timestamp FROM {SCHEMA}.flat
+    """))
+
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.partitioned (timestamp)"))
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.partitioned (user_id, timestamp)"))
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.partitioned (action, timestamp)"))
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.partitioned (timestamp, action) WHERE user_id IS NULL"))
+    conn.execute(text(f"ANALYZE {SCHEMA}.flat"))
+    conn.execute(text(f"ANALYZE {SCHEMA}.partitioned"))
+
+# ----------------------------------------------------
+# Measurements
+# ----------------------------------------------------
+def time_query(conn, sql: str, repeat: int) -> float:
+    """Median wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql)).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def time_retention(conn) -> tuple[float, float]:
+    """Drop everything older than 6 months: DELETE on flat vs. dropping partitions."""
+    from server.retention import _add_months, _month_start
+
+    this_month = _month_start(datetime.utcnow())
+    cutoff = _add_months(this_month, -6)
+
+    start = time.perf_counter()
+    conn.execute(text(f"DELETE FROM {SCHEMA}.flat WHERE timestamp < :cutoff"), {"cutoff": cutoff})
+    delete_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for months_back in range(MONTHS, 6, -1):
+        month = _add_months(this_month, -months_back)
+        name = f"{SCHEMA}.partitioned_y{month:%Y}m{month:%m}"
+        conn.execute(text(f"ALTER TABLE {SCHEMA}.partitioned DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    drop_ms = (time.perf_counter() - start) * 1000
+    return delete_ms, drop_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the bench schema afterwards")
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not url or not url.startswith(("postgresql", "postgres")):
+        raise SystemExit("❌ Set BENCH_DATABASE_URL (or DATABASE_URL) to a PostgreSQL database.")
+    os.environ.setdefault("DATABASE_URL", url)  # partition bounds come from server.retention
+    os.environ.setdefault("JWT_SECRET", "audit-bench-secret")
+
+    engine = create_engine(url.replace("postgres://", "postgresql://", 1), future=True)
+    with engine.begin() as conn:
+        print(f"Populating {args.rows:,} rows...")
+        start = time.perf_counter()
+        setup(conn, args.rows)
+        print(f"Setup took {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'query':<20}{'legacy (ms)':>14}{'partitioned (ms)':>18}")
+    with engine.begin() as conn:
+        for name, sql in QUERIES.items():
+            flat = time_query(conn, sql.format(table=f"{SCHEMA}.flat"), args.repeat)
+            part = time_query(conn, sql.format(table=f"{SCHEMA}.partitioned"), args.repeat)
+            print(f"{name:<20}{flat:>14.2f}{part:>18.2f}")
+
+    with engine.begin() as conn:
+        delete_ms, drop_ms = time_retention(conn)
+        print(f"{'retention':<20}{delete_ms:>14.2f}{drop_ms:>18.2f}")
+
+    if not args.keep:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+load_test.py — End-to-End Load Test
+===================================
+
+Drives the real FastAPI app (uvicorn subprocess) against local stand-ins for
+the Hugging Face router and the GitHub REST API, so runs are repeatable on an
+ordinary Linux box without network access or API keys.
+
+    python -m server.benchmarks.load_test --concurrency 1,8,32 --requests 200
+    python -m server.benchmarks.load_test --save-baseline server/benchmarks/baselines/load_test.json
+    python -m server.benchmarks.load_test --baseline server/benchmarks/baselines/load_test.json
+
+The app runs on SQLite by default (needs `aiosqlite`); set BENCH_DATABASE_URL
+to point it at PostgreSQL instead.
+
+Scenarios:
+- login    POST /auth/login (bcrypt pool + async DB)
+- tree     GET /repo/tree on a stand-in repo of `--tree-files` entries
+- task     POST /tasks/run/brainstorm, then read /tasks/{id}/stream to the end
+- fanout   one task per worker with `--subscribers` concurrent streams each
+
+Stand-in behaviour is configurable: `--hf-latency`, `--gh-latency` (ms),
+`--hf-error-rate` (503s, exercising client retries), `--completion-chars`,
+`--tree-files`. Each scenario reports throughput, p50/p95/p99 latency, errors
+and server RSS. With `--baseline`, the run exits non-zero when any p95 grows
+or throughput drops by more than `--tolerance`.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_REPO = "bench/repo"
+BENCH_EMAIL = "loadtest@example.com"
+BENCH_PASSWORD = "loadtest-password"
+
+# ----------------------------------------------------
+# Upstream Stand-ins
+# ----------------------------------------------------
+class StandInConfig:
+    def __init__(self, args):
+        self.hf_latency = args.hf_latency / 1000
+        self.gh_latency = args.gh_latency / 1000
+        self.hf_error_rate = args.hf_error_rate
+        self.completion_chars = args.completion_chars
+        self.tree_files = args.tree_files
+
+
+def _sha(value: str) -> str:
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+def make_handler(config: StandInConfig):
+    commit_sha = _sha("commit")
+    tree = [
+        {"path": f"src/module_{i // 50}/file_{i}.py", "type": "blob", "sha": _sha(f"blob{i}"), "size": 1200}
+        for i in range(config.tree_files)
+    ]
+    tree += [{"path": f"src/module_{d}", "type": "tree", "sha": _sha(f"tree{d}")} for d in range(config.tree_files // 50 + 1)]
+    file_body = base64.b64encode(b"def handler(event):\n    return event\n" * 30).decode()
+    completion = ("DevBot load-test response. " * (config.completion_chars // 27 + 1))[:config.completion_chars]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: dict, headers: dict | None = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):  # Hugging Face router: /v1/chat/completions
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(config.hf_latency)
+            if random.random() < config.hf_error_rate:
+                return self._send(503, {"error": "stand-in overloaded"})
+            prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+            self._send(200, {
+                "choices": [{"message": {"role": "assistant", "content": completion}}],
+                "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(completion) // 4},
+            })
+
+        def do_GET(self):  # GitHub REST API
+            time.sleep(config.gh_latency)
+            path = urlparse(self.path).path
+            headers = {"X-RateLimit-Remaining": "4999"}
+            if "/git/trees/" in path:
+                return self._send(200, {"sha": _sha("root"), "tree": tree, "truncated": False}, headers)
+            if "/git/blobs/" in path or "/contents/" in path:
+                return self._send(200, {"content": file_body, "encoding": "base64"}, headers)
+            if "/commits/" in path:
+                return self._send(200, {"sha": commit_sha}, headers)
+            if "/branches/" in path:
+                return self._send(200, {"commit": {"sha": commit_sha}}, headers)
+            if path.count("/") == 3 and path.startswith("/repos/"):
+                return self._send(200, {"default_branch": "main"}, headers)
+            self._send(404, {"message": "Not Found"}, headers)
+
+    return Handler
+
+
+def start_stand_in(config: StandInConfig) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# ----------------------------------------------------
+# App Under Test
+# ----------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(stand_in_url: str, workdir: str) -> tuple[subprocess.Popen, str]:
+    """Create the schema and launch uvicorn with upstreams pointed at the stand-in."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT,
+        "DATABASE_URL": os.getenv("BENCH_DATABASE_URL", f"sqlite:///{workdir}/bench.db"),
+        "JWT_SECRET": os.getenv("JWT_SECRET", "load-test-secret"),
+        "HF_API_KEY": os.getenv("HF_API_KEY", "load-test-key"),
+        "HF_API_URL": f"{stand_in_url}/v1/chat/completions",
+        "GITHUB_API_URL": stand_in_url,
+        "BCRYPT_ROUNDS": os.getenv("BCRYPT_ROUNDS", "10"),
+    }
+    subprocess.run(
+        [sys.executable, "-c", "from server.models import Base; from server.database import engine; "
+                               "Base.metadata.create_all(engine)"],
+        cwd=workdir, env=env, check=True,
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/ping", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("❌ App did not become ready within 30s")
+
+
+def rss_mb(pid: int) -> tuple[float, float]:
+    """(current, peak) resident set size of a process in MB (Linux /proc)."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, amount, _ = line.split()
+                    values[key] = int(amount) / 1024
+    except OSError:
+        pass
+    return values.get("VmRSS:", 0.0), values.get("VmHWM:", 0.0)
+
+# ----------------------------------------------------
+# Scenarios
+# ----------------------------------------------------
+async def read_stream(client: httpx.AsyncClient, task_id: int) -> int:
+    """Read one SSE stream to completion; returns the number of events received."""
+    events = 0
+    async with client.stream("GET", f"/tasks/{task_id}/stream") as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if line.startswith("data:"):
+                events += 1
+    return events
+
+
+async def op_login(client, _):
+    resp = await client.post("/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    resp.raise_for_status()
+
+
+async def op_tree(client, _):
+    resp = await client.get("/repo/tree", params={"repo_id": BENCH_REPO})
+    resp.raise_for_status()
+
+
+async def op_task(client, _):
+    resp = await client.post("/tasks/run/brainstorm", json={"idea": "load test"})
+    resp.raise_for_status()
+    await read_stream(client, resp.json()["task_id"])
+
+
+async def op_fanout(client, subscribers):
+    resp = await client.post("/tasks/run/brainstorm", json={"idea": "fan-out"})
+    resp.raise_for_status()
+    task_id = resp.json()["task_id"]
+    counts = await asyncio.gather(*(read_stream(client, task_id) for _ in range(subscribers)))
+    if len(set(counts)) != 1:
+        raise RuntimeError(f"subscribers saw different event counts: {sorted(set(counts))}")
+
+
+SCENARIOS = {"login": op_login, "tree": op_tree, "task": op_task, "fanout": op_fanout}
+
+
+async def run_scenario(base_url: str, op, concurrency: int, requests: int, subscribers: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency * max(subscribers, 1) + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        latencies, errors = [], 0
+        remaining = iter(range(requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    await op(client, subscribers)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except Exception:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2),
+        "errors": errors,
+    }
+
+# ----------------------------------------------------
+# Baselines
+# ----------------------------------------------------
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of p95 latency / throughput beyond `tolerance` (fraction)."""
+    failures = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            failures.append(f"{key}: p95 {current['p95_ms']:.1f}ms vs baseline {base['p95_ms']:.1f}ms")
+        if base["throughput_rps"] and current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            failures.append(
+                f"{key}: throughput {current['throughput_rps']:.1f}/s vs baseline {base['throughput_rps']:.1f}/s"
+            )
+        if current["errors"] > base.get("errors", 0):
+            failures.append(f"{key}: {current['errors']} errors vs baseline {base.get('errors', 0)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="operations per scenario and level")
+    parser.add_argument("--subscribers", type=int, default=8, help="SSE streams per task (fanout)")
+    parser.add_argument("--hf-latency", type=float, default=50.0, help="ms")
+    parser.add_argument("--gh-latency", type=float, default=20.0, help="ms")
+    parser.add_argument("--hf-error-rate", type=float, default=0.0)
+    parser.add_argument("--completion-chars", type=int, default=2000)
+    parser.add_argument("--tree-files", type=int, default=2000)
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    stand_in = start_stand_in(StandInConfig(args))
+    stand_in_url = f"http://127.0.0.1:{stand_in.server_address[1]}"
+    workdir = tempfile.mkdtemp(prefix="devbot-load-")
+    proc, base_url = start_app(stand_in_url, workdir)
+
+    results = {}
+    try:
+        httpx.post(f"{base_url}/auth/signup", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}, timeout=30)
+        print(f"{'scenario':<10}{'conc':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'errors':>8}{'rss MB':>9}{'peak MB':>9}")
+        for name in args.scenarios.split(","):
+            for level in (int(c) for c in args.concurrency.split(",")):
+                requests = args.requests if name != "fanout" else max(level, args.requests // args.subscribers)
+                stats = asyncio.run(run_scenario(base_url, SCENARIOS[name], level, requests, args.subscribers))
+                stats["rss_mb"], stats["peak_rss_mb"] = (round(v, 1) for v in rss_mb(proc.pid))
+                results[f"{name}@{level}"] = stats
+                print(f"{name:<10}{level:>6}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.1f}"
+                      f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['errors']:>8}"
+                      f"{stats['rss_mb']:>9.1f}{stats['peak_rss_mb']:>9.1f}")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        stand_in.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        if failures:
+            print("\n❌ Regressions beyond tolerance:")
+            for failure in failures:
+                print(f"  - {failure}")
+            raise SystemExit(1)
+        print("\n✅ Within tolerance of baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+middleware.py — Middleware Overhead Microbenchmark
+==================================================
+
+Measures the per-request cost of each HTTP middleware in isolation and as the
+full stack, using in-process ASGI calls (no sockets, no upstream I/O):
+
+    python -m server.benchmarks.middleware
+    python -m server.benchmarks.middleware --save-baseline server/benchmarks/baselines/middleware.json
+    python -m server.benchmarks.middleware --baseline server/benchmarks/baselines/middleware.json
+
+Variants (each mounts the real route handlers on a fresh app):
+- bare          routes only
+- log_requests  main.log_requests (body capture + logging + metrics)
+- cors          CORSMiddleware with an allowed Origin header on every request
+- security      SecurityMiddleware (allowlist, guest rate limit, audit commit)
+- full          log_requests + CORS + SecurityMiddleware
+
+Endpoints: `/health/ping` and `/repo/tree` returning a pre-built payload of
+`--tree-files` entries (GitHub is bypassed, so only middleware cost differs).
+
+Overhead = median µs/request of a variant minus `bare`. SecurityMiddleware
+writes audit rows, so a database is required: a SQLite file in a temporary
+directory (removed afterwards; needs `aiosqlite`) by default, or
+BENCH_DATABASE_URL for PostgreSQL. With
+`--baseline`, exits non-zero when any overhead exceeds the baseline by more
+than `--tolerance` plus `--slack-us` (absolute noise allowance).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+ORIGIN = "https://dashboard.example"
+VARIANTS = ("bare", "log_requests", "cors", "security", "full")
+ENDPOINTS = {
+    "ping": ("/health/ping", b""),
+    "tree": ("/repo/tree", b"repo_id=bench/repo"),
+}
+
+# ----------------------------------------------------
+# App Variants
+# ----------------------------------------------------
+def build_app(variant: str):
+    # Deferred: settings are read at import, after main() has pointed the app at the scratch database
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from server import github, main as app_main
+    from server.security import SecurityMiddleware
+
+    app = FastAPI()
+    app.get("/health/ping")(app_main.ping)
+    app.include_router(github.router)
+
+    # Same order as main.py: CORS innermost, log_requests outermost
+    if variant in ("security", "full"):
+        app.add_middleware(SecurityMiddleware)
+    if variant in ("cors", "full"):
+        app.add_middleware(
+            CORSMiddleware, allow_origins=[ORIGIN], allow_credentials=True,
+            allow_methods=["*"], allow_headers=["*"],
+        )
+    if variant in ("log_requests", "full"):
+        app.middleware("http")(app_main.log_requests)
+    return app
+
+
+def fake_tree(files: int) -> dict:
+    entries = [{"path": f"src/module_{i // 50}/file_{i}.tsx", "type": "blob", "size": 1200} for i in range(files)]
+    return {"repo": "bench/repo", "branch": "main", "sha": "0" * 40, "count": files, "files": entries}
+
+# ----------------------------------------------------
+# In-Process ASGI Driver
+# ----------------------------------------------------
+async def call(app, path: str, query: bytes = b"") -> int:
+    """One GET through the ASGI app; returns the response body size."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query, "root_path": "",
+        "headers": [(b"host", b"bench"), (b"origin", ORIGIN.encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    state = {"status": None, "size": 0, "requested": False}
+
+    async def receive():
+        if not state["requested"]:
+            state["requested"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            state["size"] += len(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    if state["status"] != 200:
+        raise RuntimeError(f"{path} returned {state['status']}")
+    return state["size"]
+
+
+async def measure(apps: dict, path: str, query: bytes, iterations: int, rounds: int) -> dict:
+    """Median µs/request per variant; variants are interleaved per round to cancel drift."""
+    for app in apps.values():  # warm-up (route compilation, DB connections, caches)
+        for _ in range(max(iterations // 10, 5)):
+            await call(app, path, query)
+
+    samples = {name: [] for name in apps}
+    for _ in range(rounds):
+        for name, app in apps.items():
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await call(app, path, query)
+            samples[name].append((time.perf_counter() - start) / iterations * 1e6)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+# ----------------------------------------------------
+# Baseline Gate
+# ----------------------------------------------------
+def compare(results: dict, baseline: dict, tolerance: float, slack_us: float) -> list[str]:
+    failures = []
+    for endpoint, variants in results.items():
+        for variant, current in variants["overhead_us"].items():
+            base = baseline.get(endpoint, {}).get("overhead_us", {}).get(variant)
+            if base is None:
+                continue
+            allowed = max(base, 0.0) * (1 + tolerance) + slack_us
+            if current > allowed:
+                failures.append(f"{endpoint} {variant}: {current:.1f}µs overhead (allowed {allowed:.1f}µs)")
+    return failures
+
+
+def run(args) -> dict:
+    """Build the variants and measure every endpoint (cwd is the scratch directory)."""
+    from server import github
+    from server.database import dispose_async_engine, engine
+    from server.models import Base
+
+    Base.metadata.create_all(engine)
+    tree = fake_tree(args.tree_files)
+    github.get_github_service().get_repo_tree = lambda *a, **k: tree
+    apps = {variant: build_app(variant) for variant in VARIANTS}
+
+    async def run_all() -> dict:
+        # One event loop for every measurement: pooled async DB connections are loop-bound
+        try:
+            return {
+                name: (await call(apps["bare"], path, query),
+                       await measure(apps, path, query, args.iterations, args.rounds))
+                for name, (path, query) in ENDPOINTS.items()
+            }
+        finally:
+            await dispose_async_engine()
+
+    try:
+        return asyncio.run(run_all())
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200, help="requests per variant per round")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--tree-files", type=int, default=5000)
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression (fraction)")
+    parser.add_argument("--slack-us", type=float, default=25.0, help="absolute noise allowance (µs)")
+    args = parser.parse_args()
+    invoked_from = os.getcwd()
+    resolve = lambda path: os.path.join(invoked_from, path)  # noqa: E731 (paths are relative to the caller)
+
+    with tempfile.TemporaryDirectory(prefix="devbot-mw-") as workdir:
+        os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+        os.environ.setdefault("JWT_SECRET", "middleware-bench-secret")
+        os.environ.setdefault("HF_API_KEY", "middleware-bench-key")
+        os.chdir(workdir)  # debug.log / logs/ written by the app stay out of the tree
+        try:
+            measured = run(args)
+        finally:
+            os.chdir(invoked_from)
+
+    results = {}
+    for name, (size, timings) in measured.items():
+        path = ENDPOINTS[name][0]
+        bare = timings["bare"]
+        results[name] = {
+            "response_bytes": size,
+            "us_per_request": {v: round(t, 1) for v, t in timings.items()},
+            "overhead_us": {v: round(t - bare, 1) for v, t in timings.items() if v != "bare"},
+        }
+
+        print(f"\n{name} ({path}, {size:,} B response)")
+        print(f"{'variant':<14}{'µs/req':>10}{'overhead µs':>14}{'x bare':>9}")
+        for variant, t in timings.items():
+            print(f"{variant:<14}{t:>10.1f}{t - bare:>14.1f}{t / bare:>9.2f}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(resolve(args.save_baseline)), exist_ok=True)
+        with open(resolve(args.save_baseline), "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(resolve(args.baseline)) as f:
+            failures = compare(results, json.load(f), args.tolerance, args.slack_us)
+        if failures:
+            print("\n❌ Middleware overhead regressed:")
+            for failure in failures:
+                print(f"  - {failure}")
+            raise SystemExit(1)
+        print("\n✅ Within tolerance of baseline")
+
+
+if __name__ == "__main__":
+    main()
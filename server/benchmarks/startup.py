@@ -0,0 +1,103 @@
+"""
+startup.py — Import-Time Benchmark
+==================================
+
+Measures how long a fresh worker takes to import the app (`server.main`),
+which is what delays new autoscaled instances from taking traffic.
+
+    python -m server.benchmarks.startup
+    python -m server.benchmarks.startup --runs 10 --top 20 --max-ms 1200
+
+Each run is a fresh interpreter with `-X importtime`. Reported:
+- wall time to import `server.main` (median / min over `--runs`)
+- import cost per first-party module (self + cumulative, median over runs)
+- the heaviest third-party packages pulled in, by top-level package
+
+With `--max-ms`, exits non-zero when the median wall time exceeds the budget.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+PROBE = (
+    "import time; t = time.perf_counter(); import server.main; "
+    "print(f'WALL_MS={(time.perf_counter() - t) * 1000:.2f}')"
+)
+
+
+def run_once(workdir: str) -> tuple[float, dict]:
+    """One fresh interpreter: (wall ms, {module: (self µs, cumulative µs, depth)})."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT,
+        "DATABASE_URL": os.getenv("DATABASE_URL", f"sqlite:///{workdir}/startup.db"),
+        "JWT_SECRET": os.getenv("JWT_SECRET", "startup-bench-secret"),
+    }
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    wall = float(re.search(r"WALL_MS=([\d.]+)", proc.stdout).group(1))
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="third-party packages to list")
+    parser.add_argument("--max-ms", type=float, help="fail if median wall time exceeds this")
+    args = parser.parse_args()
+
+    walls, self_times, cumulative_times = [], defaultdict(list), defaultdict(list)
+    with tempfile.TemporaryDirectory(prefix="devbot-startup-") as workdir:
+        for _ in range(args.runs):
+            wall, modules = run_once(workdir)
+            walls.append(wall)
+            for name, (self_us, cumulative_us, _) in modules.items():
+                self_times[name].append(self_us)
+                cumulative_times[name].append(cumulative_us)
+
+    median = lambda values: statistics.median(values) / 1000  # noqa: E731 (µs → ms)
+
+    print(f"import server.main: median {statistics.median(walls):.1f} ms, min {min(walls):.1f} ms "
+          f"({args.runs} runs)\n")
+
+    print(f"{'first-party module':<28}{'self ms':>10}{'cumulative ms':>15}")
+    first_party = sorted(
+        (n for n in self_times if n == "server" or n.startswith("server.")),
+        key=lambda n: -median(cumulative_times[n]),
+    )
+    for name in first_party:
+        print(f"{name:<28}{median(self_times[name]):>10.1f}{median(cumulative_times[name]):>15.1f}")
+
+    # Third-party cost by top-level package (sum of self time of all its modules)
+    packages = defaultdict(float)
+    for name, values in self_times.items():
+        if not name.startswith("server"):
+            packages[name.split(".")[0]] += median(values)
+    print(f"\n{'third-party package':<28}{'self ms':>10}")
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<28}{ms:>10.1f}")
+
+    if args.max_ms is not None and statistics.median(walls) > args.max_ms:
+        print(f"\n❌ Startup import {statistics.median(walls):.1f} ms exceeds budget {args.max_ms:.1f} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+compression.py — Response Compression
+=====================================
+
+Pure-ASGI middleware that compresses large responses (repo trees, task
+details with full output + logs) for dashboard clients on slow links.
+
+Responsibilities:
+- Negotiate `br` / `gzip` from `Accept-Encoding` (q-values honoured; brotli
+  only when the optional `brotli` package is installed).
+- Skip small bodies (`COMPRESSION_MIN_SIZE`), non-text content types,
+  already-encoded responses and Server-Sent Events (which must flush as-is).
+- Compress streaming bodies chunk by chunk, flushing after each chunk so
+  streamed output is never held back.
+"""
+
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from server.config import settings
+
+try:  # optional: brotli is preferred when available, gzip otherwise
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported encoding for an Accept-Encoding header (br preferred on ties)."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    wildcard = weights.get("*", 0.0)
+    best = max(candidates, key=lambda enc: weights.get(enc, wildcard), default=None)
+    return best if best and weights.get(best, wildcard) > 0 else None
+
+
+class _Encoder:
+    """Incremental compressor: `compress(chunk)` flushes so each chunk is decodable on arrival."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self._gz = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._br.process(chunk) + self._br.flush()
+        return self._gz.compress(chunk) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, chunk: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._br.process(chunk) + self._br.finish()
+        return self._gz.compress(chunk) + self._gz.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                length = headers.get("content-length")
+                passthrough = (
+                    "content-encoding" in headers
+                    or content_type.startswith(EXCLUDED_TYPES)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (length is not None and length.isdigit() and int(length) < self.minimum_size)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message  # held until the first body chunk decides
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True  # small single-chunk body: not worth compressing
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                encoder = _Encoder(encoding)
+                data = encoder.compress(body) if more_body else encoder.finish(body)
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]  # streamed: length unknown up front
+                else:
+                    headers["Content-Length"] = str(len(data))
+                await send(start_message)
+            else:
+                data = encoder.compress(body) if more_body else encoder.finish(body)
+
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -8,6 +8,21 @@ class Settings(BaseSettings):
     if not database_url:
         raise ValueError("❌ DATABASE_URL is not set. Please configure it in your environment.")
 
+    # Async driver URL (optional — derived from DATABASE_URL as postgresql+asyncpg / sqlite+aiosqlite)
+    database_async_url: str = os.getenv("DATABASE_ASYNC_URL", "")
+
+    # Connection pool tuning (ignored for SQLite)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a connection
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before reconnecting
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # Audit log retention (monthly partitions, PostgreSQL only)
+    audit_retention_months: int = int(os.getenv("AUDIT_RETENTION_MONTHS", "6"))
+    audit_partitions_ahead: int = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+    audit_retention_interval: int = int(os.getenv("AUDIT_RETENTION_INTERVAL", "86400"))  # seconds
+
     # JWT secret for signing tokens (must be set in Render or defaults to None)
     jwt_secret: str = os.getenv("JWT_SECRET")
     if not jwt_secret:
@@ -16,11 +31,83 @@ class Settings(BaseSettings):
     # GitHub tokens
     github_token: str = os.getenv("GITHUB_TOKEN", "")  # Classic token
     github_fine_token: str = os.getenv("GITHUB_FINE_TOKEN", "")  # Fine-grained PAT
+    github_api_url: str = os.getenv("GITHUB_API_URL", "https://api.github.com")  # override for stand-ins
+    github_webhook_secret: str = os.getenv("GITHUB_WEBHOOK_SECRET", "")  # push webhook HMAC secret ("" = disabled)
+    github_ref_ttl: float = float(os.getenv("GITHUB_REF_TTL", "30"))  # s a branch → SHA answer is reused
+    github_tokens: str = os.getenv("GITHUB_TOKENS", "")  # extra comma-separated tokens for the request pool
+    github_rate_limit_reserve: int = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "5"))  # requests left unused per token
+    github_rate_limit_max_wait: float = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "10"))  # s to defer, then fail
 
     # Hugging Face integration
     hf_api_key: str = os.getenv("HF_API_KEY", "")
     hf_model: str = os.getenv("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
     hf_max_tokens: int = int(os.getenv("HF_MAX_TOKENS", "8192"))  # ✅ configurable max tokens
+    hf_api_url: str = os.getenv("HF_API_URL", "https://router.huggingface.co/v1/chat/completions")
+    hf_small_model: str = os.getenv("HF_SMALL_MODEL", "meta-llama/Llama-3.2-3B-Instruct")  # "" disables routing
+    hf_small_context_tokens: int = int(os.getenv("HF_SMALL_CONTEXT_TOKENS", "1500"))  # prompts up to this go small
+    hf_fallback_models: str = os.getenv("HF_FALLBACK_MODELS", "")  # comma list, tried after a preset's model
+
+    # Hugging Face resilience (per-model circuit breaker, jittered retries, retry budget)
+    hf_retries: int = int(os.getenv("HF_RETRIES", "3"))  # attempts per request
+    hf_backoff_base: float = float(os.getenv("HF_BACKOFF_BASE", "1.0"))  # seconds
+    hf_backoff_cap: float = float(os.getenv("HF_BACKOFF_CAP", "20"))  # max wait (also max Retry-After honoured)
+    hf_breaker_failures: int = int(os.getenv("HF_BREAKER_FAILURES", "5"))  # consecutive failures to open
+    hf_breaker_reset: float = float(os.getenv("HF_BREAKER_RESET", "30"))  # seconds before a probe
+    hf_retry_budget_ratio: float = float(os.getenv("HF_RETRY_BUDGET_RATIO", "0.2"))  # retries per request (10s window)
+    hf_retry_budget_min: int = int(os.getenv("HF_RETRY_BUDGET_MIN", "3"))  # retries always allowed per window
+    hf_hedge_after: float = float(os.getenv("HF_HEDGE_AFTER", "0"))  # seconds; 0 = no hedging
+    hf_hedge_model: str = os.getenv("HF_HEDGE_MODEL", "")  # raced against slow requests; "" = preset's 1st fallback
+    hf_hedge_workers: int = int(os.getenv("HF_HEDGE_WORKERS", "32"))  # threads for hedged calls (primary + hedge)
+
+    # Password hashing (bcrypt runs in a dedicated process pool)
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # cost factor; changes trigger rehash on login
+    bcrypt_pool_size: int = int(os.getenv("BCRYPT_POOL_SIZE", "0"))  # 0 = one worker per CPU core
+    bcrypt_max_pending: int = int(os.getenv("BCRYPT_MAX_PENDING", "64"))  # queued jobs before 503
+
+    # Conversation memory (per user, rolling summary)
+    memory_token_budget: int = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))  # recent turns before compaction
+    memory_keep_recent: int = int(os.getenv("MEMORY_KEEP_RECENT", "4"))  # messages kept verbatim
+    memory_turn_chars: int = int(os.getenv("MEMORY_TURN_CHARS", "2000"))  # stored chars per message
+    memory_summary_tokens: int = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+    memory_cache_users: int = int(os.getenv("MEMORY_CACHE_USERS", "256"))
+
+    # Retrieval (BM25 over repo files, per commit SHA)
+    retrieval_top_k: int = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+    retrieval_chunk_lines: int = int(os.getenv("RETRIEVAL_CHUNK_LINES", "40"))
+    retrieval_max_files: int = int(os.getenv("RETRIEVAL_MAX_FILES", "200"))
+    retrieval_max_file_bytes: int = int(os.getenv("RETRIEVAL_MAX_FILE_BYTES", "100000"))
+
+    # Hierarchical structure summaries (cached per directory tree SHA)
+    summary_max_depth: int = int(os.getenv("SUMMARY_MAX_DEPTH", "4"))
+    summary_max_tokens: int = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+    summary_concurrency: int = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+    # GitHub cache warming ("owner/repo[@branch][:path,path]" targets, ";"-separated; "" disables)
+    cache_warm_targets: str = os.getenv("CACHE_WARM_TARGETS", "AlexSeisler/AI-Dev-Federation-Dashboard:src/App.tsx")
+    cache_warm_interval: int = int(os.getenv("CACHE_WARM_INTERVAL", "300"))  # seconds between SHA checks
+    cache_warm_retrieval: bool = os.getenv("CACHE_WARM_RETRIEVAL", "true").lower() == "true"  # prebuild BM25 index
+
+    # Response compression (gzip / brotli when installed; SSE is never compressed)
+    compression_min_size: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    compression_gzip_level: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    compression_brotli_quality: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Health probes (background; /healthz serves the cached results)
+    health_probe_interval: float = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))  # s between passes; 0 disables
+    health_probe_timeout: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", "3"))  # s per probe
+    health_stale_after: float = float(os.getenv("HEALTH_STALE_AFTER", "60"))  # s before a result counts as stale
+    health_loop_lag_threshold: float = float(os.getenv("HEALTH_LOOP_LAG_THRESHOLD", "0.5"))  # s of lag = degraded
+    health_critical: str = os.getenv("HEALTH_CRITICAL", "db,event_loop")  # probes whose failure returns 503
+
+    # Task drain + resume (graceful shutdown on rolling deploys)
+    task_drain_timeout: float = float(os.getenv("TASK_DRAIN_TIMEOUT", "20"))  # s running tasks get to finish
+    task_resume: bool = os.getenv("TASK_RESUME", "true").lower() == "true"  # re-run interrupted tasks after restart
+    task_resume_batch: int = int(os.getenv("TASK_RESUME_BATCH", "50"))  # interrupted tasks resumed per pass
+    task_heartbeat_interval: float = float(os.getenv("TASK_HEARTBEAT_INTERVAL", "15"))  # s between running-task checkpoints
+    task_stale_after: float = float(os.getenv("TASK_STALE_AFTER", "60"))  # s without heartbeat = instance died
+
+    # Task phase tracing (optional JSONL export of finished task traces)
+    trace_export_path: str = os.getenv("TRACE_EXPORT_PATH", "")
 
     class Config:
         env_file = ".env"
@@ -1,17 +1,110 @@
-from sqlalchemy import create_engine
+import time
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from server.config import settings
-import logging
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
+# Async drivers used for the AsyncSession engine
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Pool statistics (shared by the sync + async engines)
+POOL_STATS = {
+    "connects": 0,
+    "checkouts": 0,
+    "checkins": 0,
+    "checkout_wait_total_s": 0.0,
+    "checkout_wait_max_s": 0.0,
+}
+
+
+def _pool_kwargs(url: URL) -> dict:
+    """QueuePool tuning from settings (SQLite keeps SQLAlchemy's defaults)."""
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _instrument(sync_engine):
+    """Count connects/checkouts/checkins on an engine's pool."""
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        POOL_STATS["connects"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        POOL_STATS["checkouts"] += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        POOL_STATS["checkins"] += 1
+
+
+def _async_url(database_url: str) -> tuple[URL, dict]:
+    """Derive the asyncpg/aiosqlite URL (+ connect args) from DATABASE_URL."""
+    raw = settings.database_async_url or database_url
+    if raw.startswith("postgres://"):
+        raw = "postgresql://" + raw[len("postgres://"):]
+
+    url = make_url(raw)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and "+" not in url.drivername:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+
+    # asyncpg does not understand libpq's sslmode query parameter
+    connect_args = {}
+    if url.drivername == "postgresql+asyncpg" and "sslmode" in url.query:
+        connect_args["ssl"] = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"])
+    return url, connect_args
+
+
 # SQLAlchemy engine
-engine = create_engine(settings.database_url, future=True, echo=False)
+_sync_url = make_url(settings.database_url)
+engine = create_engine(_sync_url, future=True, echo=False, **_pool_kwargs(_sync_url))
+_instrument(engine)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (created on first use)
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        url, connect_args = _async_url(settings.database_url)
+        _async_engine = create_async_engine(url, echo=False, connect_args=connect_args, **_pool_kwargs(url))
+        _instrument(_async_engine.sync_engine)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Return a new AsyncSession bound to the async engine."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory()
+
 
 # Dependency for FastAPI routes
 def get_db():
@@ -23,3 +116,47 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async dependency: yields an AsyncSession with a connection already checked out."""
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        try:
+            await db.connection()
+            wait = time.perf_counter() - start
+            POOL_STATS["checkout_wait_total_s"] += wait
+            POOL_STATS["checkout_wait_max_s"] = max(POOL_STATS["checkout_wait_max_s"], wait)
+            yield db
+        except HTTPException:
+            await db.rollback()
+            raise
+        except Exception as e:
+            logger.error("Database session error", exc_info=e)
+            await db.rollback()
+            raise
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
+def pool_stats() -> dict:
+    """Snapshot of connection-pool state for both engines."""
+    def _state(eng):
+        pool = eng.pool
+        return {
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        }
+
+    return {
+        **POOL_STATS,
+        "sync": _state(engine),
+        "async": _state(_async_engine.sync_engine) if _async_engine is not None else None,
+    }
@@ -12,8 +12,8 @@ os.makedirs("logs", exist_ok=True)
 logger = logging.getLogger("debug")
 logger.setLevel(logging.DEBUG)
 
-# File handler (UTF-8 safe)
-fh = logging.FileHandler("logs/debug.log", encoding="utf-8")
+# File handler (UTF-8 safe; opened on first record, not at import)
+fh = logging.FileHandler("logs/debug.log", encoding="utf-8", delay=True)
 fh.setLevel(logging.DEBUG)
 formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
 fh.setFormatter(formatter)
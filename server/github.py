@@ -1,9 +1,19 @@
-from fastapi import APIRouter, HTTPException
+import hashlib
+import hmac
+import json
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 from typing import Optional
-from server.github_service import GitHubService
+from server import warmer
+from server.config import settings
+from server.debug import debug_log
+from server.github_service import (
+    SHA_RE, CommitPage, RateLimitExhausted, RefInfo, RepoTree, get_github_service,
+)
+from server.outline import FileOutline, UnsupportedLanguage, get_file_outline
 
 router = APIRouter(prefix="/repo", tags=["GitHub"])
-github_service = GitHubService()
 
 
 def parse_repo_id(repo_id: str):
@@ -22,12 +32,15 @@ def parse_repo_id(repo_id: str):
 # 1️⃣ Repo Tree
 # -------------------------------------------------
 # server/github.py
-@router.get("/tree")
-async def get_repo_tree(repo_id: str, branch: str = "main", recursive: bool = True, path_prefix: Optional[str] = ""):
+@router.get("/tree", response_model=RepoTree)
+def get_repo_tree(repo_id: str, branch: str = "main", recursive: bool = True, path_prefix: Optional[str] = ""):
     try:
         owner, repo = parse_repo_id(repo_id)
-        result = github_service.get_repo_tree(owner, repo, branch, recursive, path_prefix)
-        return result
+        result = get_github_service().get_repo_tree(owner, repo, branch, recursive, path_prefix)
+        # Returned as a Response: skips jsonable_encoder + response_model validation
+        return ORJSONResponse(result)
+    except RateLimitExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         import traceback
         print(f"[ERROR] get_repo_tree failed: {str(e)}")
@@ -40,7 +53,7 @@ async def get_repo_tree(repo_id: str, branch: str = "main", recursive: bool = Tr
 # 2️⃣ File Content
 # -------------------------------------------------
 @router.get("/file")
-async def get_file_content(
+def get_file_content(
     repo_id: str,
     file_path: str,
     branch: str = "main",
@@ -49,7 +62,7 @@ async def get_file_content(
 ):
     try:
         owner, repo = parse_repo_id(repo_id)
-        result = github_service.get_file(
+        result = get_github_service().get_file(
             owner,
             repo,
             file_path,
@@ -58,6 +71,144 @@ async def get_file_content(
             chunk_size=chunk_size
         )
         return result
+    except RateLimitExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"[ERROR] get_file_content failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve file content")
+
+
+# -------------------------------------------------
+# 2️⃣b File Structure (symbol outline)
+# -------------------------------------------------
+@router.get("/file/structure", response_model=FileOutline)
+def get_file_structure(repo_id: str, file_path: str, branch: str = "main"):
+    """Imports / classes / functions / exports of a file with line ranges (cached per blob SHA)."""
+    owner, repo = parse_repo_id(repo_id)
+    try:
+        return ORJSONResponse(get_file_outline(get_github_service(), owner, repo, file_path, branch))
+    except UnsupportedLanguage as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
+    except SyntaxError as e:
+        raise HTTPException(status_code=422, detail=f"Could not parse {file_path}: {e.msg} (line {e.lineno})")
+    except RateLimitExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] get_file_structure failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to outline file: {str(e)}")
+
+
+# -------------------------------------------------
+# 3️⃣ Tree Diff
+# -------------------------------------------------
+@router.get("/diff")
+def get_tree_diff(repo_id: str, base: str, head: str):
+    """Paths added / removed / modified (by blob SHA) between two commits."""
+    owner, repo = parse_repo_id(repo_id)
+    try:
+        return {"repo": repo_id, "base": base, "head": head, **get_github_service().diff_trees(owner, repo, base, head)}
+    except RateLimitExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] get_tree_diff failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to diff trees: {str(e)}")
+
+
+# -------------------------------------------------
+# 3️⃣b Branch SHA + Commit History
+# -------------------------------------------------
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+@router.get("/sha", response_model=RefInfo)
+def get_branch_sha(repo_id: str, branch: str = "main"):
+    """Current head SHA of a branch, from the pinned / TTL ref cache when possible (freshness check)."""
+    owner, repo = parse_repo_id(repo_id)
+    try:
+        branch, sha, source = get_github_service().lookup_ref(owner, repo, branch)
+    except RateLimitExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] get_branch_sha failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to resolve branch: {str(e)}")
+    return ORJSONResponse({"repo": repo_id, "branch": branch, "sha": sha, "source": source},
+                          headers={"Cache-Control": "private, no-cache"})
+
+
+@router.get("/history", response_model=CommitPage)
+def get_commit_history(
+    repo_id: str,
+    branch: str = "main",
+    path: Optional[str] = None,
+    cursor: Optional[str] = None,
+    per_page: int = Query(30, ge=1, le=100),
+):
+    """
+    Commits newest-first. Without `cursor` the page starts at the branch head;
+    pass the returned `next_cursor` (a commit SHA) for older pages. Pages that
+    start at an explicit SHA never change and are served as immutable.
+    """
+    owner, repo = parse_repo_id(repo_id)
+    if cursor is not None and not SHA_RE.match(cursor):
+        raise HTTPException(status_code=400, detail="cursor must be a 40-character commit SHA")
+    try:
+        service = get_github_service()
+        start = cursor or service.resolve_sha(owner, repo, branch)[1]
+        page = service.get_commits(owner, repo, start, path, per_page)
+    except RateLimitExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] get_commit_history failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve history: {str(e)}")
+    return ORJSONResponse(page, headers={"Cache-Control": IMMUTABLE if cursor else "private, no-cache"})
+
+
+# -------------------------------------------------
+# 4️⃣ Push Webhook (cache invalidation)
+# -------------------------------------------------
+ZERO_SHA = "0" * 40
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check GitHub's `X-Hub-Signature-256: sha256=<hmac hex>` over the raw body."""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.removeprefix("sha256="))
+
+
+@router.post("/webhook", status_code=202)
+async def github_webhook(request: Request, background_tasks: BackgroundTasks):
+    """
+    GitHub push webhook: re-pin the pushed branch's SHA (after pre-warming it).
+    Tree / blob / summary caches are keyed by content SHA, so only the
+    branch → SHA mapping can go stale; everything else stays valid.
+    """
+    if not settings.github_webhook_secret:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+    body = await request.body()
+    if not verify_signature(settings.github_webhook_secret, body, request.headers.get("X-Hub-Signature-256")):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    event = request.headers.get("X-GitHub-Event", "")
+    if event == "ping":
+        return {"status": "pong"}
+    if event != "push":
+        return {"status": "ignored", "event": event}
+
+    try:
+        payload = json.loads(body)
+        owner, repo = parse_repo_id(payload["repository"]["full_name"])
+        ref, after = payload["ref"], payload["after"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Malformed push payload")
+    if not ref.startswith("refs/heads/"):
+        return {"status": "ignored", "ref": ref}  # tags
+
+    branch = ref.removeprefix("refs/heads/")
+    sha = None if payload.get("deleted") or after == ZERO_SHA else after
+    debug_log("GitHub push webhook", context={"repo": f"{owner}/{repo}", "branch": branch, "sha": sha})
+    background_tasks.add_task(warmer.apply_push, owner, repo, branch, sha)
+    return {"status": "accepted", "repo": f"{owner}/{repo}", "branch": branch, "sha": sha}
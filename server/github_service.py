@@ -5,110 +5,438 @@ github_service.py — GitHub API Integration
 This module wraps the GitHub REST API to provide:
 - Repository tree browsing
 - File content retrieval (with truncation for large files)
-- Branch/SHA resolution for stable requests
+- Branch/SHA resolution for stable requests (short-TTL ref cache behind pinned refs)
+- Cursor-paginated commit history (pages below a SHA never change: cached for good)
+- Tree diffs between commits (by blob SHA) for incremental cache refresh
+- Pinned refs: branch → SHA answers kept fresh by the cache warmer
+  (`server.warmer`), so warmed repos resolve and read files without GitHub calls
+- Authenticated requests through a token pool: rotate to the token with the
+  most quota left, track `X-RateLimit-*` per token, defer when all are spent
 
 Also exposes FastAPI routes under `/repo/*` for frontend integration.
 """
 
 import base64
+import re
+import threading
+import time
 import traceback
-import requests
-from typing import Optional
-from requests.exceptions import RequestException
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
+from typing_extensions import TypedDict
 
+from server import metrics
+from server.cache import LRUCache
 from server.config import settings
 from server.debug import debug_log
+from server.resilience import parse_retry_after
+from server.tracing import span
+
+# ----------------------------------------------------
+# Content-addressed caches (shared by all service instances)
+# ----------------------------------------------------
+SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+_tree_cache = LRUCache(maxsize=64, name="github_tree")  # (owner, repo, sha, recursive) → tree payload
+_blob_cache = LRUCache(maxsize=2048, name="github_blob")  # (owner, repo, blob_sha) → decoded text
+_history_cache = LRUCache(maxsize=256, name="github_history")  # (owner, repo, start_sha, path, per_page) → page
+_ref_cache = LRUCache(maxsize=256, ttl=settings.github_ref_ttl, name="github_ref")  # mutable: branch → SHA
+_pinned_refs: Dict[tuple, tuple] = {}  # (owner, repo, requested branch or None) → (branch, sha)
+
+
+def pin_ref(owner: str, repo: str, requested_branch: Optional[str], branch: str, sha: str):
+    """Serve `resolve_sha` for this ref from memory (the warmer re-pins when the SHA moves)."""
+    _pinned_refs[(owner, repo, requested_branch)] = (branch, sha)
+    _pinned_refs[(owner, repo, branch)] = (branch, sha)
+
+
+def pinned_ref(owner: str, repo: str, branch: Optional[str] = None) -> Optional[tuple]:
+    return _pinned_refs.get((owner, repo, branch))
+
+
+def invalidate_ref(owner: str, repo: str, branch: str):
+    """Drop TTL-cached answers for `branch` (incl. the default-branch alias) after a push."""
+    _ref_cache.pop((owner, repo, branch))
+    default = _ref_cache.get((owner, repo, None))
+    if default and default[0] == branch:
+        _ref_cache.pop((owner, repo, None))
+
+
+def repin_branch(owner: str, repo: str, branch: str, sha: Optional[str]) -> int:
+    """Point every pin resolving to `branch` at `sha` (None drops them); returns pins changed."""
+    keys = [k for k, (b, _) in _pinned_refs.items() if k[:2] == (owner, repo) and b == branch]
+    for key in keys:
+        if sha is None:
+            del _pinned_refs[key]
+        else:
+            _pinned_refs[key] = (branch, sha)
+    return len(keys)
+
+# ----------------------------------------------------
+# Response Shapes
+# ----------------------------------------------------
+class TreeEntry(TypedDict):
+    path: str
+    type: str
+    size: int
+
+
+class RepoTree(TypedDict):
+    """Condensed tree payload (plain dicts, so it serializes straight to orjson)."""
+    repo: str
+    branch: str
+    sha: str
+    count: int
+    files: List[TreeEntry]
+
+
+class RefInfo(TypedDict):
+    repo: str
+    branch: str
+    sha: str
+    source: str  # pinned | cache | github
+
+
+class CommitSummary(TypedDict):
+    sha: str
+    summary: str  # first line of the message
+    author: Optional[str]
+    date: Optional[str]
+    parents: List[str]
+    html_url: Optional[str]
+
+
+class CommitPage(TypedDict):
+    repo: str
+    path: Optional[str]
+    commits: List[CommitSummary]
+    next_cursor: Optional[str]  # SHA to pass as `cursor` for the next (older) page
 
 # ----------------------------------------------------
 # Router
 # ----------------------------------------------------
 router = APIRouter(prefix="/repo", tags=["repo"])
 
+# ----------------------------------------------------
+# Token Pool (rate-limit aware)
+# ----------------------------------------------------
+RATE_LIMIT_DEFAULT_WAIT = 60  # s a token rests when GitHub limits it without a reset time
+
+
+class RateLimitExhausted(RuntimeError):
+    """Every token is out of quota and the next reset is beyond GITHUB_RATE_LIMIT_MAX_WAIT."""
+
+
+@dataclass
+class _TokenState:
+    name: str  # metric label — never the secret itself
+    token: Optional[str]  # None = anonymous
+    scheme: str = "token"
+    remaining: Optional[int] = None  # unknown until the first response
+    reset_at: float = 0.0  # epoch seconds (X-RateLimit-Reset)
+    disabled: bool = False  # rejected with 401
+
+    def headers(self) -> dict:
+        return {"Authorization": f"{self.scheme} {self.token}"} if self.token else {}
+
+    def available(self, now: float, reserve: int) -> bool:
+        if self.disabled:
+            return False
+        return self.remaining is None or self.remaining > reserve or now >= self.reset_at
+
+
+class TokenPool:
+    """Pick the token with the most quota left; wait (bounded) when all are spent."""
+
+    def __init__(self, states: List[_TokenState], reserve: int, max_wait: float):
+        self.states = states
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "TokenPool":
+        states = []
+        if settings.github_fine_token:
+            states.append(_TokenState("fine", settings.github_fine_token, "Bearer"))
+        if settings.github_token:
+            states.append(_TokenState("classic", settings.github_token, "token"))
+        pool_tokens = [t.strip() for t in settings.github_tokens.split(",") if t.strip()]
+        states += [_TokenState(f"pool_{i}", token, "Bearer") for i, token in enumerate(pool_tokens, 1)]
+        if not states:
+            states.append(_TokenState("anonymous", None))
+        return cls(states, settings.github_rate_limit_reserve, settings.github_rate_limit_max_wait)
+
+    def acquire(self, exclude: tuple = ()) -> _TokenState:
+        """Token for the next request (reserves one unit of its known quota)."""
+        while True:
+            with self._lock:
+                now = time.time()
+                candidates = [s for s in self.states if s.name not in exclude and not s.disabled]
+                if not candidates:
+                    raise RateLimitExhausted("No usable GitHub token (all rejected or already tried)")
+                usable = [s for s in candidates if s.available(now, self.reserve)]
+                if usable:
+                    # Unknown quota sorts first: probing it is how we learn it
+                    state = max(usable, key=lambda s: float("inf") if s.remaining is None or now >= s.reset_at
+                                else s.remaining)
+                    if state.remaining is not None and now < state.reset_at:
+                        state.remaining -= 1
+                    return state
+                wait = min(s.reset_at for s in candidates) - now
+            if wait > self.max_wait:
+                raise RateLimitExhausted(f"GitHub rate limit exhausted; next reset in {wait:.0f}s")
+            metrics.GITHUB_RATE_LIMIT_WAITS.inc()
+            debug_log("GitHub rate limit reached, deferring request", context={"wait_s": round(wait, 1)})
+            time.sleep(max(wait, 0.05))
+
+    def update(self, state: _TokenState, response):
+        """Record quota from a response (and disable tokens GitHub rejects)."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        with self._lock:
+            if response.status_code == 401 and state.token:
+                state.disabled = True
+                debug_log("GitHub token rejected, removed from pool", context={"token": state.name})
+            if remaining is not None and remaining.isdigit():
+                state.remaining = int(remaining)
+            if reset is not None and reset.isdigit():
+                state.reset_at = float(reset)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code in (403, 429) and retry_after is not None:  # secondary rate limit
+                state.remaining = 0
+                state.reset_at = max(state.reset_at, time.time() + retry_after)
+            if self.is_rate_limited(response) and state.reset_at <= time.time():
+                state.remaining = 0  # limited without a usable reset time: back off a default window
+                state.reset_at = time.time() + RATE_LIMIT_DEFAULT_WAIT
+        if state.remaining is not None:
+            metrics.GITHUB_RATE_LIMIT_REMAINING.set(state.remaining, token=state.name)
+            metrics.GITHUB_RATE_LIMIT_RESET.set(state.reset_at, token=state.name)
+
+    @staticmethod
+    def is_rate_limited(response) -> bool:
+        return response.status_code in (403, 429) and (
+            response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+        )
+
 # ----------------------------------------------------
 # GitHub Service
 # ----------------------------------------------------
 class GitHubService:
     def __init__(self):
-        self.base_url = "https://api.github.com"
-        self.tokens = {
-            "finegrained": settings.github_fine_token,
-            "classic": settings.github_token,
-        }
+        self.base_url = settings.github_api_url.rstrip("/")
+        self.pool = TokenPool.from_settings()
+        self.anonymous = _TokenState("anonymous", None)
         self.timeout = 10
 
     # ------------------------
     # Internal request wrapper
     # ------------------------
     def _request(self, method, url, use_auth=True, **kwargs):
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "User-Agent": "AI-Dev-Federation-Dashboard",
-        }
+        import requests  # deferred: ~50 ms of import time, only needed on the first GitHub call
+        from requests.exceptions import RequestException
 
-        if use_auth and (self.tokens["finegrained"] or self.tokens["classic"]):
-            token = self.tokens["finegrained"] or self.tokens["classic"]
-            scheme = "Bearer" if self.tokens["finegrained"] else "token"
-            headers["Authorization"] = f"{scheme} {token}"
+        tried = ()
+        while True:
+            state = self.pool.acquire(exclude=tried) if use_auth else self.anonymous
+            headers = {
+                "Accept": "application/vnd.github.v3+json",
+                "User-Agent": "AI-Dev-Federation-Dashboard",
+                **state.headers(),
+            }
+            debug_log("GitHub API request", context={"method": method, "url": url, "token": state.name})
 
-        debug_log("GitHub API request", context={"method": method, "url": url, "use_auth": use_auth})
+            start = time.perf_counter()
+            try:
+                with span("github.request", path=url.replace(self.base_url, "", 1).split("?")[0]) as attrs:
+                    response = requests.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+                    attrs["status"] = response.status_code
+            except RequestException as e:
+                metrics.GITHUB_REQUESTS.inc(status="error")
+                debug_log("GitHub API request error", e, context={"method": method, "url": url})
+                raise
+            metrics.GITHUB_LATENCY.observe(time.perf_counter() - start)
+            metrics.GITHUB_REQUESTS.inc(status=response.status_code)
+            self.pool.update(state, response)
 
-        try:
-            response = requests.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
-            debug_log("GitHub API response", context={"status_code": response.status_code})
+            # Rejected or rate-limited token: fail over to the next one in the pool
+            if use_auth and (response.status_code == 401 or TokenPool.is_rate_limited(response)):
+                tried += (state.name,)
+                if len(tried) < len(self.pool.states):
+                    continue
+                if TokenPool.is_rate_limited(response):
+                    # Every token is spent: acquire() defers until a reset or raises RateLimitExhausted
+                    tried = ()
+                    continue
+            break
 
-            if response.status_code != 200:
-                debug_log("GitHub API non-200 body", context={"body": response.text[:500]})
+        debug_log("GitHub API response", context={"status_code": response.status_code, "token": state.name})
+        if response.status_code != 200:
+            debug_log("GitHub API non-200 body", context={"body": response.text[:500]})
 
+        try:
             response.raise_for_status()
-            return response.json()
         except RequestException as e:
             debug_log("GitHub API request error", e, context={"method": method, "url": url})
             raise
+        return response.json()
 
     # ------------------------
     # Public API
     # ------------------------
-    def get_repo_tree(
-        self,
-        owner: str,
-        repo: str,
-        branch: Optional[str] = None,
-        recursive: bool = True,
-        path_prefix: Optional[str] = None,
-        limit: Optional[int] = None,
-        offset: Optional[int] = None,
-    ):
-        """Retrieve repository file tree (condensed)."""
-        repo_url = f"{self.base_url}/repos/{owner}/{repo}"
-        repo_data = self._request("GET", repo_url, use_auth=False)
-        default_branch = repo_data.get("default_branch", "main")
+    def resolve_sha(self, owner: str, repo: str, branch: Optional[str] = None, refresh: bool = False):
+        """Resolve a branch (default branch if omitted) to its head commit SHA.
+
+        Pinned refs and the short-TTL ref cache answer from memory unless `refresh` is set.
+        """
+        return self.lookup_ref(owner, repo, branch, refresh)[:2]
 
-        branch = branch or default_branch
+    def lookup_ref(self, owner: str, repo: str, branch: Optional[str] = None, refresh: bool = False):
+        """(branch, sha, source): source is "pinned", "cache" or "github"."""
+        if not refresh:
+            pinned = pinned_ref(owner, repo, branch)
+            if pinned:
+                return (*pinned, "pinned")
+            cached = _ref_cache.get((owner, repo, branch))
+            if cached:
+                return (*cached, "cache")
+
+        requested = branch
+        if not branch:
+            repo_url = f"{self.base_url}/repos/{owner}/{repo}"
+            repo_data = self._request("GET", repo_url)
+            branch = repo_data.get("default_branch", "main")
         debug_log("Resolved branch", context={"branch": branch})
 
         sha = None
         try:
             commit_url = f"{self.base_url}/repos/{owner}/{repo}/commits/{branch}"
-            commit_data = self._request("GET", commit_url, use_auth=False)
+            commit_data = self._request("GET", commit_url)
             sha = commit_data["sha"]
         except Exception as e1:
             debug_log("Commit lookup failed", e1)
             try:
                 branch_url = f"{self.base_url}/repos/{owner}/{repo}/branches/{branch}"
-                branch_data = self._request("GET", branch_url, use_auth=False)
+                branch_data = self._request("GET", branch_url)
                 sha = branch_data["commit"]["sha"]
             except Exception as e2:
                 debug_log("Branch lookup failed", e2)
                 ref_url = f"{self.base_url}/repos/{owner}/{repo}/git/refs/heads/{branch}"
-                ref_data = self._request("GET", ref_url, use_auth=False)
+                ref_data = self._request("GET", ref_url)
                 sha = ref_data["object"]["sha"]
 
         if not sha:
             raise RuntimeError(f"Could not resolve branch {branch} to SHA")
+        _ref_cache.set((owner, repo, requested), (branch, sha))
+        if requested is None:
+            _ref_cache.set((owner, repo, branch), (branch, sha))
+        return branch, sha, "github"
+
+    def get_commits(self, owner: str, repo: str, start_sha: str, path: Optional[str] = None, per_page: int = 30) -> CommitPage:
+        """One page of history reachable from `start_sha` (inclusive), newest first.
+
+        A page is fully determined by (start SHA, path, size), so it is cached
+        indefinitely; `next_cursor` is the first commit of the following page.
+        """
+        key = (owner, repo, start_sha, path or None, per_page)
+        cached = _history_cache.get(key)
+        if cached is not None:
+            return cached
+
+        params = {"sha": start_sha, "per_page": per_page + 1}  # one extra commit = next cursor
+        if path:
+            params["path"] = path
+        with span("github.commits", per_page=per_page):
+            raw = self._request("GET", f"{self.base_url}/repos/{owner}/{repo}/commits", params=params)
+
+        commits = [
+            {
+                "sha": c["sha"],
+                "summary": (c.get("commit", {}).get("message") or "").split("\n", 1)[0],
+                "author": (c.get("commit", {}).get("author") or {}).get("name"),
+                "date": (c.get("commit", {}).get("author") or {}).get("date"),
+                "parents": [p["sha"] for p in c.get("parents", [])],
+                "html_url": c.get("html_url"),
+            }
+            for c in raw[:per_page]
+        ]
+        page = {
+            "repo": f"{owner}/{repo}", "path": path or None, "commits": commits,
+            "next_cursor": raw[per_page]["sha"] if len(raw) > per_page else None,
+        }
+        if SHA_RE.match(start_sha):
+            _history_cache.set(key, page)
+        return page
+
+    def get_tree(self, owner: str, repo: str, sha: str, recursive: bool = True):
+        """Raw git tree payload: root tree `sha`, `tree` entries and `truncated` flag."""
+        key = (owner, repo, sha, recursive)
+        cached = _tree_cache.get(key)
+        if cached is not None:
+            return cached
 
         url = f"{self.base_url}/repos/{owner}/{repo}/git/trees/{sha}?recursive={1 if recursive else 0}"
-        raw_tree = self._request("GET", url, use_auth=False).get("tree", [])
+        tree = self._request("GET", url)
+        if SHA_RE.match(sha):  # only SHAs are immutable; never cache by branch name
+            _tree_cache.set(key, tree)
+        return tree
+
+    def get_tree_entries(self, owner: str, repo: str, sha: str, recursive: bool = True):
+        """Raw git tree entries (path, type, sha, size) for a commit or tree SHA."""
+        return self.get_tree(owner, repo, sha, recursive).get("tree", [])
+
+    def get_blob_content(self, owner: str, repo: str, blob_sha: str) -> str:
+        """Decoded text of a blob (by blob SHA — immutable, so cached indefinitely)."""
+        key = (owner, repo, blob_sha)
+        cached = _blob_cache.get(key)
+        if cached is not None:
+            return cached
+
+        url = f"{self.base_url}/repos/{owner}/{repo}/git/blobs/{blob_sha}"
+        blob = self._request("GET", url)
+        content = base64.b64decode(blob.get("content", "")).decode("utf-8", errors="ignore")
+        _blob_cache.set(key, content)
+        return content
+
+    def diff_trees(self, owner: str, repo: str, base_sha: str, head_sha: str) -> Dict[str, List[str]]:
+        """Compare two commits' recursive trees by blob SHA: added / removed / modified paths."""
+        def _blobs(sha):
+            return {
+                e["path"]: e["sha"]
+                for e in self.get_tree(owner, repo, sha, True).get("tree", [])
+                if e.get("type") == "blob"
+            }
+
+        base, head = _blobs(base_sha), _blobs(head_sha)
+        diff = {
+            "added": sorted(head.keys() - base.keys()),
+            "removed": sorted(base.keys() - head.keys()),
+            "modified": sorted(p for p in head.keys() & base.keys() if head[p] != base[p]),
+        }
+        debug_log("Tree diff computed", context={
+            "repo": f"{owner}/{repo}", "base": base_sha, "head": head_sha,
+            **{k: len(v) for k, v in diff.items()},
+        })
+        return diff
+
+    def get_repo_tree(
+        self,
+        owner: str,
+        repo: str,
+        branch: Optional[str] = None,
+        recursive: bool = True,
+        path_prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> RepoTree:
+        """Retrieve repository file tree (condensed)."""
+        with span("github.resolve_sha"):
+            branch, sha = self.resolve_sha(owner, repo, branch)
+        with span("github.tree"):
+            raw_tree = self.get_tree_entries(owner, repo, sha, recursive)
 
         if path_prefix:
             raw_tree = [item for item in raw_tree if item["path"].startswith(path_prefix)]
@@ -121,19 +449,40 @@ class GitHubService:
         ]
 
         debug_log("Repo tree retrieved", context={"repo": f"{owner}/{repo}", "count": len(condensed)})
-        return {"repo": f"{owner}/{repo}", "branch": branch, "count": len(condensed), "files": condensed}
+        return {"repo": f"{owner}/{repo}", "branch": branch, "sha": sha, "count": len(condensed), "files": condensed}
+
+    def _pinned_file(self, owner: str, repo: str, path: str, branch: Optional[str]) -> Optional[tuple]:
+        """(branch, content) via the cached tree + blob of a pinned ref; None if not pinned / not found."""
+        pinned = pinned_ref(owner, repo, branch)
+        if not pinned:
+            return None
+        branch, sha = pinned
+        blob_sha = next(
+            (e["sha"] for e in self.get_tree_entries(owner, repo, sha) if e["path"] == path and e.get("type") == "blob"),
+            None,
+        )
+        if blob_sha is None:
+            return None
+        return branch, self.get_blob_content(owner, repo, blob_sha)
 
     def get_file_content(self, owner: str, repo: str, path: str, branch: Optional[str] = None, max_chars: int = 20000):
         """Retrieve file content from GitHub (decoded + truncated if large)."""
-        if not branch:
-            repo_url = f"{self.base_url}/repos/{owner}/{repo}"
-            repo_data = self._request("GET", repo_url, use_auth=False)
-            branch = repo_data.get("default_branch", "main")
-
-        url = f"{self.base_url}/repos/{owner}/{repo}/contents/{path}?ref={branch}"
-        file_data = self._request("GET", url, use_auth=False)
+        pinned = self._pinned_file(owner, repo, path, branch)
+        if pinned:
+            branch, content = pinned
+        else:
+            if not branch and pinned_ref(owner, repo):
+                branch = pinned_ref(owner, repo)[0]
+            if not branch:
+                with span("github.default_branch"):
+                    repo_url = f"{self.base_url}/repos/{owner}/{repo}"
+                    repo_data = self._request("GET", repo_url)
+                    branch = repo_data.get("default_branch", "main")
 
-        content = base64.b64decode(file_data["content"]).decode("utf-8", errors="ignore")
+            with span("github.file", path=path):
+                url = f"{self.base_url}/repos/{owner}/{repo}/contents/{path}?ref={branch}"
+                file_data = self._request("GET", url)
+                content = base64.b64decode(file_data["content"]).decode("utf-8", errors="ignore")
 
         if len(content) > max_chars:
             debug_log("Truncating file content", context={
@@ -153,27 +502,33 @@ class GitHubService:
         result = self.get_file_content(owner, repo, path, branch)
         return result["content"]
 
+
+@lru_cache(maxsize=1)
+def get_github_service() -> GitHubService:
+    """Shared service instance, created on first use instead of at import."""
+    return GitHubService()
+
 # ----------------------------------------------------
 # Routes
 # ----------------------------------------------------
-@router.get("/tree")
-async def get_repo_tree(repo_id: str, branch: str = "main", recursive: bool = True, path_prefix: Optional[str] = ""):
+@router.get("/tree", response_model=RepoTree)
+def get_repo_tree(repo_id: str, branch: str = "main", recursive: bool = True, path_prefix: Optional[str] = ""):
     """API route: return repository tree (condensed)."""
     try:
         owner, repo = repo_id.split("/")
-        service = GitHubService()
-        return service.get_repo_tree(owner, repo, branch, recursive, path_prefix)
+        service = get_github_service()
+        return ORJSONResponse(service.get_repo_tree(owner, repo, branch, recursive, path_prefix))
     except Exception as e:
         debug_log("Failed to retrieve repo tree", e, context={"repo_id": repo_id, "branch": branch})
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to retrieve repo tree: {str(e)}")
 
 @router.get("/file")
-async def get_repo_file(repo_id: str, path: str, branch: str = "main"):
+def get_repo_file(repo_id: str, path: str, branch: str = "main"):
     """API route: return file content (decoded + truncated)."""
     try:
         owner, repo = repo_id.split("/")
-        service = GitHubService()
+        service = get_github_service()
         return service.get_file_content(owner, repo, path, branch)
     except Exception as e:
         debug_log("Failed to retrieve file", e, context={"repo_id": repo_id, "path": path, "branch": branch})
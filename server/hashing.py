@@ -0,0 +1,157 @@
+"""
+hashing.py — Password Hashing Pool
+==================================
+
+This module keeps bcrypt work off the event loop and out of the shared
+threadpool used by sync routes.
+
+Responsibilities:
+- Run password hashing/verification in a dedicated, bounded process pool.
+- Apply the configured bcrypt cost factor (`BCRYPT_ROUNDS`).
+- Transparently produce an upgraded hash on login when the cost changes.
+- Track queue-wait and in-flight statistics for observability.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from server.config import settings
+from server.debug import debug_log
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# ----------------------------------------------------
+# Worker-side helpers (run inside the process pool)
+# ----------------------------------------------------
+@lru_cache(maxsize=4)
+def _context(rounds: int) -> "CryptContext":
+    """Build (once per worker) a bcrypt context for the given cost factor."""
+    from passlib.context import CryptContext  # imported in workers only
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _hash_worker(password: str, rounds: int, submitted_at: float) -> Tuple[str, float]:
+    started_at = time.time()
+    return _context(rounds).hash(password), started_at - submitted_at
+
+
+def _verify_worker(
+    password: str, password_hash: str, rounds: int, submitted_at: float
+) -> Tuple[bool, Optional[str], float]:
+    started_at = time.time()
+    valid, new_hash = _context(rounds).verify_and_update(password, password_hash)
+    return valid, new_hash, started_at - submitted_at
+
+# ----------------------------------------------------
+# Pool Management
+# ----------------------------------------------------
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+STATS = {
+    "submitted": 0,
+    "completed": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "rehashed": 0,
+    "queue_wait_total_s": 0.0,
+    "queue_wait_max_s": 0.0,
+}
+
+
+def _pool_size() -> int:
+    return settings.bcrypt_pool_size or (os.cpu_count() or 1)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=_pool_size())
+        debug_log("Password hashing pool started", context={
+            "workers": _pool_size(), "rounds": settings.bcrypt_rounds,
+        })
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    """Bound queued + running jobs; anything beyond is rejected with 503."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(_pool_size() + settings.bcrypt_max_pending)
+    return _slots
+
+
+async def _submit(fn, *args):
+    slots = _get_slots()
+    if slots.locked():
+        STATS["rejected"] += 1
+        debug_log("Password hashing pool saturated", context={"in_flight": STATS["in_flight"]})
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server busy, please retry.")
+
+    submitted_at = time.time()
+    async with slots:
+        STATS["submitted"] += 1
+        STATS["in_flight"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(_get_executor(), fn, *args, submitted_at)
+        finally:
+            STATS["in_flight"] -= 1
+
+    # Last element of every worker result is the time spent waiting for a slot/worker
+    queue_wait = result[-1]
+    STATS["completed"] += 1
+    STATS["queue_wait_total_s"] += queue_wait
+    STATS["queue_wait_max_s"] = max(STATS["queue_wait_max_s"], queue_wait)
+    if queue_wait > 1.0:
+        debug_log("Password hashing queue wait high", context={"wait_seconds": round(queue_wait, 3)})
+    return result[:-1]
+
+
+def shutdown():
+    """Stop the worker processes (called on app shutdown)."""
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _slots = None
+
+
+def stats() -> dict:
+    """Snapshot of pool statistics (queue wait in seconds)."""
+    completed = STATS["completed"]
+    return {
+        **STATS,
+        "workers": _pool_size(),
+        "rounds": settings.bcrypt_rounds,
+        "queue_wait_avg_s": STATS["queue_wait_total_s"] / completed if completed else 0.0,
+    }
+
+# ----------------------------------------------------
+# Public API
+# ----------------------------------------------------
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured cost factor."""
+    (password_hash,) = await _submit(_hash_worker, password, settings.bcrypt_rounds)
+    return password_hash
+
+
+async def verify_password(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password against its stored hash.
+
+    Returns (valid, new_hash). `new_hash` is set when the stored hash was
+    produced with a different cost factor and should be persisted.
+    """
+    valid, new_hash = await _submit(_verify_worker, password, password_hash, settings.bcrypt_rounds)
+    if new_hash:
+        STATS["rehashed"] += 1
+    return valid, new_hash
@@ -0,0 +1,213 @@
+"""
+health.py — Dependency Health Probes
+====================================
+
+Background probes behind `/healthz`, so load-balancer checks are answered
+from memory instead of touching the database or upstreams on every hit.
+
+Responsibilities:
+- Every `HEALTH_PROBE_INTERVAL` seconds, probe each dependency concurrently,
+  each bounded by `HEALTH_PROBE_TIMEOUT`:
+  - `db`: a `SELECT 1` through the async pool (plus pool occupancy),
+  - `hf`: reachability of the Hugging Face router (any HTTP answer counts;
+    no tokens are spent) and open circuit breakers,
+  - `github`: `GET /rate_limit` (free of quota) to refresh the token pool's
+    view of remaining requests,
+  - `event_loop`: worst scheduling lag sampled since the previous pass.
+- Keep the latest result per probe; `snapshot()` adds staleness and the
+  overall verdict without doing any I/O.
+- Only `HEALTH_CRITICAL` probes make the instance unhealthy (503); others
+  report `degraded` so an upstream outage does not drain every instance.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import text
+from typing_extensions import TypedDict
+
+from server import metrics
+from server.config import settings
+from server.database import AsyncSessionLocal, pool_stats
+from server.debug import debug_log
+from server.resilience import CLOSED
+
+OK, DEGRADED, DOWN, UNKNOWN, STALE = "ok", "degraded", "down", "unknown", "stale"
+STATUS_VALUES = {OK: 1.0, DEGRADED: 0.5, DOWN: 0.0}
+LAG_SAMPLE_INTERVAL = 0.25  # seconds between event-loop lag samples
+
+
+class CheckResult(TypedDict):
+    status: str
+    latency_ms: float
+    checked_at: float  # epoch seconds
+    detail: dict
+
+
+class CheckView(CheckResult):
+    age_s: Optional[float]
+
+
+class HealthReport(TypedDict):
+    status: str
+    checks: Dict[str, CheckView]
+
+# ----------------------------------------------------
+# State (one set of results per process)
+# ----------------------------------------------------
+_results: Dict[str, CheckResult] = {}
+_lag = {"max_s": 0.0, "last_s": 0.0}
+
+
+def _critical() -> set:
+    return {name.strip() for name in settings.health_critical.split(",") if name.strip()}
+
+# ----------------------------------------------------
+# Probes (each returns (status, detail); exceptions mean "down")
+# ----------------------------------------------------
+async def probe_db() -> tuple:
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+    stats = pool_stats()["async"] or {}
+    return OK, {"checked_out": stats.get("checked_out"), "size": stats.get("size")}
+
+
+def probe_hf() -> tuple:
+    import requests  # deferred like hf_client: only the probe thread pays the import
+    from server.hf_client import _breakers
+
+    response = requests.get(settings.hf_api_url, timeout=settings.health_probe_timeout)
+    open_models = sorted(name for name, breaker in list(_breakers.items()) if breaker.state != CLOSED)
+    detail = {"http_status": response.status_code, "open_circuits": open_models}
+    if response.status_code >= 500:
+        return DOWN, detail
+    return (DEGRADED if open_models else OK), detail
+
+
+def probe_github() -> tuple:
+    import requests
+    from server.github_service import get_github_service
+
+    pool = get_github_service().pool
+    now = time.time()
+    state = next((s for s in pool.states if s.available(now, pool.reserve)), None) or pool.states[0]
+    response = requests.get(
+        f"{settings.github_api_url.rstrip('/')}/rate_limit",
+        headers={"Accept": "application/vnd.github.v3+json", "User-Agent": "AI-Dev-Federation-Dashboard",
+                 **state.headers()},
+        timeout=settings.health_probe_timeout,
+    )
+    pool.update(state, response)  # /rate_limit does not count against the quota
+
+    now = time.time()
+    usable = [s.name for s in pool.states if s.available(now, pool.reserve)]
+    detail = {
+        "http_status": response.status_code,
+        "tokens": {s.name: {"remaining": s.remaining, "reset_at": s.reset_at, "disabled": s.disabled}
+                   for s in pool.states},
+    }
+    if response.status_code >= 500:
+        return DOWN, detail
+    if not usable:
+        detail["next_reset_in_s"] = round(max(0.0, min(s.reset_at for s in pool.states) - now), 1)
+        return DEGRADED, detail
+    return OK, detail
+
+
+async def probe_event_loop() -> tuple:
+    worst, _lag["max_s"] = _lag["max_s"], 0.0  # window restarts each pass
+    detail = {"max_lag_ms": round(worst * 1000, 1), "last_lag_ms": round(_lag["last_s"] * 1000, 1)}
+    return (DEGRADED if worst > settings.health_loop_lag_threshold else OK), detail
+
+
+PROBES: Dict[str, Callable] = {
+    "db": probe_db,
+    "hf": probe_hf,
+    "github": probe_github,
+    "event_loop": probe_event_loop,
+}
+
+# ----------------------------------------------------
+# Runner
+# ----------------------------------------------------
+async def run_probe(name: str, probe: Callable) -> CheckResult:
+    """Run one probe under the timeout; sync probes run in a worker thread."""
+    start = time.perf_counter()
+    try:
+        call = probe() if asyncio.iscoroutinefunction(probe) else asyncio.to_thread(probe)
+        status, detail = await asyncio.wait_for(call, settings.health_probe_timeout)
+    except asyncio.TimeoutError:
+        status, detail = DOWN, {"error": f"timed out after {settings.health_probe_timeout}s"}
+    except Exception as e:
+        status, detail = DOWN, {"error": f"{type(e).__name__}: {e}"}
+
+    result: CheckResult = {
+        "status": status,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        "checked_at": time.time(),
+        "detail": detail,
+    }
+    previous = _results.get(name)
+    if status != OK and (previous is None or previous["status"] != status):
+        debug_log("Health probe changed state", context={"check": name, "status": status, **detail})
+    _results[name] = result
+    metrics.HEALTH_CHECK_STATUS.set(STATUS_VALUES[status], check=name)
+    return result
+
+
+async def run_probes() -> Dict[str, CheckResult]:
+    """One pass over every probe, concurrently."""
+    results = await asyncio.gather(*(run_probe(name, probe) for name, probe in PROBES.items()))
+    return dict(zip(PROBES, results))
+
+
+async def lag_sampler():
+    """Measure how late the loop wakes a sleeper (time blocked by other work)."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+        lag = max(0.0, time.perf_counter() - start - LAG_SAMPLE_INTERVAL)
+        _lag["last_s"] = lag
+        _lag["max_s"] = max(_lag["max_s"], lag)
+        metrics.EVENT_LOOP_LAG.set(lag)
+
+
+async def health_loop():
+    """Background task: probe every HEALTH_PROBE_INTERVAL seconds (plus the lag sampler)."""
+    sampler = asyncio.create_task(lag_sampler())
+    try:
+        while True:
+            try:
+                await run_probes()
+            except Exception as e:
+                debug_log("Health probe pass failed", e)
+            await asyncio.sleep(settings.health_probe_interval)
+    finally:
+        sampler.cancel()
+
+# ----------------------------------------------------
+# Snapshot (what /healthz serves; no I/O)
+# ----------------------------------------------------
+def snapshot() -> tuple[HealthReport, bool]:
+    """(report, healthy): cached results with ages; unhealthy if a critical probe is down or stale."""
+    now = time.time()
+    critical = _critical()
+    checks: Dict[str, CheckView] = {}
+    healthy, degraded = True, False
+
+    for name in PROBES:
+        result = _results.get(name)
+        if result is None:
+            checks[name] = {"status": UNKNOWN, "latency_ms": 0.0, "checked_at": 0.0, "detail": {}, "age_s": None}
+            continue  # not probed yet (starting up, or probes disabled)
+        age = now - result["checked_at"]
+        status = STALE if age > settings.health_stale_after else result["status"]
+        checks[name] = {**result, "status": status, "age_s": round(age, 1)}
+        if status in (DOWN, STALE) and name in critical:
+            healthy = False
+        elif status != OK:
+            degraded = True
+
+    overall = DOWN if not healthy else DEGRADED if degraded else OK
+    return {"status": overall, "checks": checks}, healthy
@@ -6,88 +6,318 @@ This module handles all interaction with the Hugging Face Inference Router API.
 
 Responsibilities:
 - Manage API authentication and environment configuration.
-- Provide task-specific system presets (brainstorm, structure, file review).
+- Provide a preset registry (brainstorm, structure, file review): prompt, model,
+  token limit, timeout and fallbacks per preset, with small-prompt routing.
 - Send chat completion requests with retries, timeouts, and backoff.
 - Normalize Hugging Face responses into plain strings.
 - Integrate with DevBot’s execution pipeline.
 """
 
+import contextvars
 import os
+import threading
 import time
 import json
-import requests
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
 
+from server import metrics
+from server.config import settings
+from server.resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RetryBudget,
+    decorrelated_jitter, parse_retry_after,
+)
+from server.tracing import span
 from server.debug import debug_log
 
 # ----------------------------------------------------
-# Environment & Config
+# Environment & Config (settings reads .env; the key is checked on first use)
 # ----------------------------------------------------
-load_dotenv()
+HF_MODEL = settings.hf_model
+HF_MAX_TOKENS = settings.hf_max_tokens  # default: 8k
+API_URL = settings.hf_api_url
 
-HF_API_KEY = os.getenv("HF_API_KEY")
-HF_MODEL = os.getenv("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
-HF_MAX_TOKENS = int(os.getenv("HF_MAX_TOKENS", "8192"))  # default: 8k
 
-if not HF_API_KEY:
-    raise ValueError("❌ HF_API_KEY not found. Check your .env file.")
+def _headers() -> Dict[str, str]:
+    if not settings.hf_api_key:
+        raise ValueError("❌ HF_API_KEY not found. Check your .env file.")
+    return {"Authorization": f"Bearer {settings.hf_api_key}"}
+
+# ----------------------------------------------------
+# Resilience (shared across tasks and threads)
+# ----------------------------------------------------
+RETRYABLE_4XX = {408, 409, 425, 429}
+CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_retry_budget = RetryBudget(settings.hf_retry_budget_ratio, settings.hf_retry_budget_min)
 
-API_URL = "https://router.huggingface.co/v1/chat/completions"
-HEADERS = {"Authorization": f"Bearer {HF_API_KEY}"}
+
+class HFRequestError(RuntimeError):
+    """Non-retryable rejection (4xx) from Hugging Face."""
 
 # ----------------------------------------------------
-# System Presets
+# Preset Registry
 # ----------------------------------------------------
-SYSTEM_PRESETS = {
-    "brainstorm": (
-        "You are DevBot. Assist with strategic planning and brainstorming. "
-        "Think step by step, propose improvements, and generate ideas."
-    ),
-    "structure": (
-        "You are DevBot. Summarize the repository structure and analyze "
-        "its architecture, highlighting key modules and responsibilities."
-    ),
-    "file": (
-        "You are DevBot. Review the given file in detail, explain its logic, "
-        "and suggest improvements or refactors where useful."
-    ),
+@dataclass(frozen=True)
+class Preset:
+    """Prompt + model routing for one task mode.
+
+    Each field can be overridden per preset via `HF_PRESET_<NAME>_<FIELD>`
+    (MODEL, MAX_TOKENS, TIMEOUT, FALLBACKS as a comma list, SMALL_MODEL,
+    SMALL_CONTEXT_TOKENS). Packed prompts up to `small_context_tokens` go to
+    `small_model`, with the regular model as their first fallback.
+    """
+    name: str
+    system_prompt: str
+    model: str
+    max_tokens: int
+    timeout: int
+    fallback_models: Tuple[str, ...] = ()
+    small_model: str = ""
+    small_context_tokens: int = 0
+
+    def route(self, prompt_tokens: int) -> List[str]:
+        """Models to try, in order, for a prompt of `prompt_tokens`."""
+        models = [self.model, *self.fallback_models]
+        if self.small_model and prompt_tokens <= self.small_context_tokens:
+            models.insert(0, self.small_model)
+        return list(dict.fromkeys(models))  # de-duplicated, order kept
+
+
+def _preset(name: str, system_prompt: str, max_tokens: int, timeout: int) -> Preset:
+    def env(field: str, default: str) -> str:
+        return os.getenv(f"HF_PRESET_{name.upper()}_{field}", default)
+
+    fallbacks = env("FALLBACKS", settings.hf_fallback_models)
+    return Preset(
+        name=name,
+        system_prompt=system_prompt,
+        model=env("MODEL", HF_MODEL),
+        max_tokens=min(int(env("MAX_TOKENS", str(max_tokens))), HF_MAX_TOKENS),
+        timeout=int(env("TIMEOUT", str(timeout))),
+        fallback_models=tuple(m.strip() for m in fallbacks.split(",") if m.strip()),
+        small_model=env("SMALL_MODEL", settings.hf_small_model),
+        small_context_tokens=int(env("SMALL_CONTEXT_TOKENS", str(settings.hf_small_context_tokens))),
+    )
+
+
+PRESETS: Dict[str, Preset] = {
+    preset.name: preset
+    for preset in (
+        _preset(
+            "brainstorm",
+            "You are DevBot. Assist with strategic planning and brainstorming. "
+            "Think step by step, propose improvements, and generate ideas.",
+            max_tokens=1024, timeout=45,
+        ),
+        _preset(
+            "structure",
+            "You are DevBot. Summarize the repository structure and analyze "
+            "its architecture, highlighting key modules and responsibilities.",
+            max_tokens=2048, timeout=90,
+        ),
+        _preset(
+            "file",
+            "You are DevBot. Review the given file in detail, explain its logic, "
+            "and suggest improvements or refactors where useful.",
+            max_tokens=2048, timeout=90,
+        ),
+    )
 }
 
+# Backward-compatible view: preset name → system prompt
+SYSTEM_PRESETS = {name: preset.system_prompt for name, preset in PRESETS.items()}
+
+# Internal summaries (memory, directories) are short and bounded: use the small model when set
+SUMMARY_MODEL = settings.hf_small_model or HF_MODEL
+
+SUMMARY_PROMPT = (
+    "You maintain DevBot's memory of a conversation. Merge the existing summary and "
+    "the new turns into one concise summary. Keep decisions, open questions, file "
+    "names and user preferences; drop pleasantries and repeated content."
+)
+
+DIRECTORY_SUMMARY_PROMPT = (
+    "You are DevBot. Summarize what this repository directory contains and its role "
+    "in the project in at most three sentences. Use the file names and the summaries "
+    "of its subdirectories; do not list every file."
+)
+
 # ----------------------------------------------------
 # Low-Level Helpers
 # ----------------------------------------------------
-def _query_hf(payload: Dict[str, Any], retries: int = 3, backoff: int = 2, timeout: int = 60) -> Dict[str, Any]:
-    """POST request to Hugging Face API with retry, timeout, and backoff."""
+def _breaker(model: str) -> CircuitBreaker:
+    """Circuit breaker shared by every caller of one model."""
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model, settings.hf_breaker_failures, settings.hf_breaker_reset)
+        return _breakers[model]
+
+
+def _query_hf(payload: Dict[str, Any], retries: Optional[int] = None, timeout: int = 60) -> Dict[str, Any]:
+    """POST request to Hugging Face API with circuit breaker, retry budget and jittered backoff."""
+    import requests  # deferred: ~50 ms of import time, only needed once a task runs
+
+    headers = _headers()
+    model = payload.get("model")
+    breaker = _breaker(model)
+    retries = retries or settings.hf_retries
+    wait = settings.hf_backoff_base
+
     for attempt in range(retries):
+        if not breaker.allow():
+            metrics.HF_REQUESTS.inc(model=model, outcome="circuit_open")
+            debug_log("HF circuit open, failing fast", context={"model": model, "retry_in": breaker.retry_in()})
+            raise CircuitOpenError(
+                f"❌ HF model {model} is unavailable (circuit open, retry in {breaker.retry_in():.0f}s)"
+            )
+        if attempt == 0:
+            _retry_budget.record_request()  # retries must not raise their own allowance
+
+        retry_after = None
+        start = time.perf_counter()
         try:
-            debug_log("HF API request", context={"attempt": attempt + 1, "model": payload.get("model")})
-            resp = requests.post(API_URL, headers=HEADERS, json=payload, timeout=timeout)
+            debug_log("HF API request", context={"attempt": attempt + 1, "model": model})
+            with span("hf.attempt", attempt=attempt + 1) as attrs:
+                resp = requests.post(API_URL, headers=headers, json=payload, timeout=timeout)
+                attrs["status"] = resp.status_code
+            metrics.HF_LATENCY.observe(time.perf_counter() - start, model=model)
 
             debug_log("HF API response status", context={"status_code": resp.status_code})
             if resp.status_code == 200:
                 debug_log("HF API success", context={"length": len(resp.text)})
-                return resp.json()
+                result = resp.json()
+                breaker.record_success()
+                metrics.HF_CIRCUIT_STATE.set(CIRCUIT_STATES[CLOSED], model=model)
+                metrics.HF_REQUESTS.inc(model=model, outcome="success")
+                usage = (result.get("usage") or {}) if isinstance(result, dict) else {}
+                for kind in ("prompt_tokens", "completion_tokens"):
+                    if usage.get(kind):
+                        metrics.HF_TOKENS.inc(usage[kind], model=model, kind=kind.replace("_tokens", ""))
+                return result
 
+            metrics.HF_REQUESTS.inc(model=model, outcome=f"http_{resp.status_code}")
             debug_log("HF API error", context={"status": resp.status_code, "text": resp.text[:500]})
 
+            # Client errors will not succeed on retry and say nothing about provider health
+            if 400 <= resp.status_code < 500 and resp.status_code not in RETRYABLE_4XX:
+                breaker.record_success()  # the provider answered; the request itself is bad
+                raise HFRequestError(f"❌ HF API rejected request (HTTP {resp.status_code}): {resp.text[:200]}")
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+
+        except HFRequestError:
+            raise
         except requests.Timeout:
+            metrics.HF_LATENCY.observe(time.perf_counter() - start, model=model)
+            metrics.HF_REQUESTS.inc(model=model, outcome="timeout")
             debug_log("HF API timeout", context={"timeout": timeout})
         except Exception as e:
+            metrics.HF_REQUESTS.inc(model=model, outcome="error")
             debug_log("HF API request failed", e)
 
+        breaker.record_failure()
+        metrics.HF_CIRCUIT_STATE.set(CIRCUIT_STATES[breaker.state], model=model)
+
         # Final retry exhausted
         if attempt == retries - 1:
             debug_log("HF API retries exhausted")
             raise RuntimeError(f"❌ HF API failed after {retries} attempts")
 
-        wait = backoff * (2 ** attempt)
-        debug_log("HF API retrying", context={"wait_seconds": wait})
-        time.sleep(wait)
+        if breaker.state == OPEN:
+            raise CircuitOpenError(f"❌ HF model {model} is unavailable (circuit opened after repeated failures)")
+
+        # Honour Retry-After (within the cap); otherwise decorrelated jitter
+        wait = decorrelated_jitter(wait, settings.hf_backoff_base, settings.hf_backoff_cap)
+        if retry_after is not None:
+            if retry_after > settings.hf_backoff_cap:
+                debug_log("HF Retry-After exceeds backoff cap, giving up", context={"retry_after": retry_after})
+                raise RuntimeError(f"❌ HF API asked to retry after {retry_after:.0f}s")
+            wait = retry_after
+
+        if not _retry_budget.try_retry():
+            metrics.HF_REQUESTS.inc(model=model, outcome="retry_budget_exhausted")
+            debug_log("HF retry budget exhausted", context={"model": model})
+            raise RuntimeError("❌ HF API failing and retry budget exhausted")
+
+        metrics.HF_RETRIES.inc(model=model)
+        debug_log("HF API retrying", context={"wait_seconds": round(wait, 2), "retry_after": retry_after})
+        with span("hf.backoff", wait_seconds=round(wait, 2)):
+            time.sleep(wait)
 
     raise RuntimeError("❌ HF API unreachable.")
 
 
+def _query_hedged(payload: Dict[str, Any], hedge_model: Optional[str] = None, timeout: int = 60) -> Dict[str, Any]:
+    """Query the primary model; if it is slow (or failing fast), race the hedge model."""
+    hedge_model = hedge_model or settings.hf_hedge_model
+    if not settings.hf_hedge_after or not hedge_model or hedge_model == payload.get("model"):
+        return _query_hf(payload, timeout=timeout)
+
+    started = threading.Event()
+
+    def run_primary():
+        started.set()
+        return _query_hf(payload, None, timeout)
+
+    # Threads do not inherit context variables: run each call in a copy (keeps tracing spans)
+    primary = _hedge_pool().submit(contextvars.copy_context().run, run_primary)
+    started.wait()  # the hedge clock starts when the primary runs, not while it queues for a worker
+    done, _ = wait([primary], timeout=settings.hf_hedge_after)
+    if done and primary.exception() is None:
+        return primary.result()
+    if done and not isinstance(primary.exception(), CircuitOpenError):
+        raise primary.exception()
+
+    debug_log("HF primary slow or unavailable, hedging", context={
+        "primary": payload.get("model"), "hedge": hedge_model,
+    })
+    hedge = _hedge_pool().submit(
+        contextvars.copy_context().run, _query_hf, {**payload, "model": hedge_model}, None, timeout
+    )
+    pending = {hedge} if done else {primary, hedge}
+    error = primary.exception() if done else None
+    while pending:
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            if future.exception() is None:
+                metrics.HF_HEDGES.inc(model=payload.get("model"), winner="hedge" if future is hedge else "primary")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        _hedge_executor = ThreadPoolExecutor(max_workers=settings.hf_hedge_workers, thread_name_prefix="hf-hedge")
+    return _hedge_executor
+
+
+def _complete_with_fallbacks(payload: Dict[str, Any], models: List[str], timeout: int) -> Dict[str, Any]:
+    """Try each routed model in turn; the first is hedged (when enabled) against
+    HF_HEDGE_MODEL, or against the next routed model when that is unset."""
+    hedge_model = settings.hf_hedge_model or (models[1] if len(models) > 1 else None)
+    error: Optional[Exception] = None
+    for index, model in enumerate(models):
+        try:
+            if index == 0:
+                return _query_hedged({**payload, "model": model}, hedge_model, timeout)
+            return _query_hf({**payload, "model": model}, timeout=timeout)
+        except HFRequestError:
+            raise
+        except Exception as e:
+            error = e
+            if index + 1 < len(models):
+                debug_log("HF model failed, falling back", e, context={"model": model, "next": models[index + 1]})
+    raise error
+
+
 def _extract_response(result: Dict[str, Any]) -> str:
     """Normalize Hugging Face API response into a string output."""
     try:
@@ -126,42 +356,78 @@ def run_completion(
     Run a Hugging Face chat completion request using the Router API.
     
     Args:
-        preset: Task mode (brainstorm, structure, file).
+        preset: Task mode (brainstorm, structure, file) — see PRESETS.
         context: User input or task context string.
-        memory: Optional conversation history (last 5 messages).
+        memory: Optional conversation history (already bounded — see memory.py).
         repo_context: Optional repository metadata (tree, file content).
-        max_tokens: Optional override for token limit.
+        max_tokens: Optional override for the preset's token limit.
     """
-    if preset not in SYSTEM_PRESETS:
+    if preset not in PRESETS:
         debug_log("Invalid preset in run_completion", context={"preset": preset})
         raise ValueError(f"❌ Invalid preset: {preset}")
+    config = PRESETS[preset]
 
     # Build messages
-    messages = [{"role": "system", "content": SYSTEM_PRESETS[preset]}]
+    messages = [{"role": "system", "content": config.system_prompt}]
 
     if repo_context:
         messages.append({"role": "system", "content": f"Repo Context:\n{repo_context}"})
 
+    if memory:
+        for m in memory:
+            messages.append({"role": m["role"], "content": str(m["content"])})
+
     user_message = str(context) if context is not None else ""
     messages.append({"role": "user", "content": user_message})
 
-    if memory:
-        for m in memory[-5:]:
-            messages.append({"role": m["role"], "content": str(m["content"])})
+    # Route by packed prompt size (~4 chars per token, as in memory.estimate_tokens)
+    prompt_tokens = sum(len(msg["content"]) // 4 + 4 for msg in messages)
+    models = config.route(prompt_tokens)
 
     payload = {
-        "model": HF_MODEL,
+        "model": models[0],
         "messages": messages,
-        "max_tokens": max_tokens or HF_MAX_TOKENS,
+        "max_tokens": max_tokens or config.max_tokens,
     }
 
     debug_log("HF Final Payload", context={
-        "model": HF_MODEL,
+        "model": models[0],
+        "fallbacks": models[1:],
+        "prompt_tokens": prompt_tokens,
+        "max_tokens": payload["max_tokens"],
         "messages": [{"role": msg["role"], "content": str(msg["content"])[:200]} for msg in messages],
     })
 
-    result = _query_hf(payload)
+    with span("hf.completion", preset=preset, model=models[0], prompt_tokens=prompt_tokens):
+        result = _complete_with_fallbacks(payload, models, config.timeout)
     response = _extract_response(result)
 
     debug_log("HF Final Response", context={"response_preview": response[:300]})
     return response
+
+
+def summarize_conversation(
+    summary: Optional[str],
+    turns: List[Dict[str, str]],
+    max_tokens: int,
+) -> str:
+    """Fold conversation turns into a rolling summary (used by conversation memory)."""
+    transcript = "\n\n".join(f"{t['role'].upper()}: {t['content']}" for t in turns)
+    messages = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+    ]
+
+    result = _query_hf({"model": SUMMARY_MODEL, "messages": messages, "max_tokens": max_tokens})
+    return _extract_response(result).strip()
+
+
+def summarize_directory(listing: str, max_tokens: int) -> str:
+    """Short summary of one directory (used by hierarchical repo summaries)."""
+    messages = [
+        {"role": "system", "content": DIRECTORY_SUMMARY_PROMPT},
+        {"role": "user", "content": listing},
+    ]
+
+    result = _query_hf({"model": SUMMARY_MODEL, "messages": messages, "max_tokens": max_tokens})
+    return _extract_response(result).strip()
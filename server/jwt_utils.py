@@ -2,10 +2,11 @@ from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from server.config import settings
-from server.database import get_db
+from server.database import get_async_db
 from server.models import User
 import logging
 
@@ -46,9 +47,9 @@ def decode_access_token(token: str):
         return None
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """FastAPI dependency that validates the JWT and returns the DB user."""
     if not token:
@@ -64,7 +65,7 @@ def get_current_user(
         logger.warning("JWT missing subject", extra={"payload": payload})
         raise HTTPException(status_code=401, detail="Invalid token: missing subject")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
     if not user:
         logger.warning("JWT user not found in DB", extra={"email": email})
         raise HTTPException(status_code=401, detail="User not found")
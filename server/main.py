@@ -8,20 +8,29 @@ Responsibilities:
 - Initialize the FastAPI app with middleware and routers.
 - Configure CORS policy (via environment variables).
 - Provide request/response logging for observability.
+- Compress large responses (gzip / brotli, SSE excluded).
 - Register feature routers (auth, tasks, GitHub integration, debug).
-- Expose health check endpoints for monitoring.
+- Run background jobs (audit retention, GitHub cache warming, health probes).
+- Drain tasks on shutdown (SIGTERM): refuse new ones, checkpoint unfinished
+  ones for the next instance to resume.
+- Expose health check endpoints for monitoring (`/healthz` serves cached probe results).
+- Expose Prometheus-style metrics at `/metrics`.
 
 """
 
 import os
 import time
+import asyncio
 import json
 import logging
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import Response
+from fastapi.responses import ORJSONResponse
+from starlette.responses import PlainTextResponse, Response
 
-from server import auth, tasks, github
+from server import auth, tasks, github, hashing, database, retention, metrics, cache, warmer, health
+from server.compression import CompressionMiddleware
+from server.config import settings
 from server.debug import router as debug_router
 from server.debug import debug_log
 
@@ -33,7 +42,8 @@ debug_log("🚀 Server startup test log")
 # ----------------------------------------------------
 app = FastAPI(
     title="AI Dev Federation Dashboard Backend",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,  # orjson for every JSON response
 )
 
 # ----------------------------------------------------
@@ -58,7 +68,7 @@ app.add_middleware(
 # Logging Setup
 # ----------------------------------------------------
 logging.basicConfig(
-    filename="debug.log",
+    handlers=[logging.FileHandler("debug.log", delay=True)],  # opened on first record
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
@@ -67,9 +77,11 @@ logging.basicConfig(
 async def log_requests(request: Request, call_next):
     """
     Middleware: log all HTTP requests/responses with timing.
-    Truncates large bodies for readability in debug.log.
+    Truncates large bodies for readability in debug.log; response bodies are
+    streamed through (never buffered), so SSE flushes immediately.
     """
     start_time = time.time()
+    perf_start = time.perf_counter()
 
     # Capture request body
     try:
@@ -85,26 +97,40 @@ async def log_requests(request: Request, call_next):
     response: Response = await call_next(request)
 
     process_time = (time.time() - start_time) * 1000
-    resp_body = b"".join([chunk async for chunk in response.body_iterator])
-    response.body_iterator = iter([resp_body])  # reset for FastAPI to return it
 
-    try:
-        resp_text = resp_body.decode("utf-8")
-        if len(resp_text) > 500:
-            resp_text = resp_text[:500] + "... (truncated)"
-    except Exception:
-        resp_text = "<unreadable>"
+    # Label by route template (not raw path) to keep metric cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.HTTP_LATENCY.observe(time.perf_counter() - perf_start, method=request.method, route=route)
+    metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+
+    # Pass the body through as it streams (SSE must not be buffered); keep a
+    # 500-byte preview and log once the body has been sent.
+    async def logged_body(body_iterator):
+        preview = b""
+        async for chunk in body_iterator:
+            if len(preview) <= 500:
+                preview += chunk if isinstance(chunk, bytes) else chunk.encode("utf-8")
+            yield chunk
+
+        try:
+            resp_text = preview.decode("utf-8")
+            if len(resp_text) > 500:
+                resp_text = resp_text[:500] + "... (truncated)"
+        except Exception:
+            resp_text = "<unreadable>"
+
+        logging.info(
+            f"📤 Response | {request.method} {request.url} | "
+            f"Status: {response.status_code} | Time: {process_time:.2f}ms | Body: {resp_text}"
+        )
+
+    response.body_iterator = logged_body(response.body_iterator)
+    return response
 
-    logging.info(
-        f"📤 Response | {request.method} {request.url} | "
-        f"Status: {response.status_code} | Time: {process_time:.2f}ms | Body: {resp_text}"
-    )
-
-    return Response(
-        content=resp_body,
-        status_code=response.status_code,
-        headers=dict(response.headers)
-    )
+# ----------------------------------------------------
+# Response Compression (outermost: logging above sees uncompressed bodies)
+# ----------------------------------------------------
+app.add_middleware(CompressionMiddleware)
 
 # ----------------------------------------------------
 # Routers
@@ -114,15 +140,81 @@ app.include_router(tasks.router)
 app.include_router(github.router)
 app.include_router(debug_router)
 
+# ----------------------------------------------------
+# Lifecycle
+# ----------------------------------------------------
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start periodic maintenance (audit log partition retention on PostgreSQL, GitHub cache warming, health probes)."""
+    tasks.drain_on_signal()
+    app.state.recovery_task = asyncio.create_task(tasks.recovery_loop())  # task heartbeats + resume
+    if database.engine.dialect.name == "postgresql":
+        app.state.retention_task = asyncio.create_task(retention.retention_loop())
+    if settings.cache_warm_targets:
+        app.state.warm_task = asyncio.create_task(warmer.warm_loop())
+    if settings.health_probe_interval > 0:
+        app.state.health_task = asyncio.create_task(health.health_loop())
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Drain running tasks, stop background worker pools (password hashing) and close DB connections."""
+    await tasks.begin_drain()
+    for name in ("retention_task", "warm_task", "health_task", "recovery_task"):
+        background_task = getattr(app.state, name, None)
+        if background_task:
+            background_task.cancel()
+    hashing.shutdown()
+    await database.dispose_async_engine()
+
 # ----------------------------------------------------
 # Health Endpoints
 # ----------------------------------------------------
-@app.get("/healthz")
+@app.get("/healthz", response_model=health.HealthReport)
 def health_check():
-    """Deep health check: confirms DB + services are alive."""
-    return {"status": "ok", "message": "Backend service is alive"}
+    """
+    Deep health check from cached background probes (DB, HF, GitHub, event loop).
+    503 when a critical probe is down or stale, so load balancers drain the instance.
+    """
+    report, healthy = health.snapshot()
+    if tasks.draining():  # shutting down: take this instance out of rotation
+        report["status"], healthy = "draining", False
+    return ORJSONResponse(report, status_code=200 if healthy else 503, headers={"Cache-Control": "no-store"})
 
 @app.get("/health/ping")
 def ping():
     """Lightweight ping (fast heartbeat)."""
     return {"pong": True}
+
+# ----------------------------------------------------
+# Metrics
+# ----------------------------------------------------
+def _pool_collector():
+    """Snapshot DB + password-hashing pool state at scrape time."""
+    db = database.pool_stats()
+    pw = hashing.stats()
+    engines = [(name, state) for name, state in (("sync", db["sync"]), ("async", db["async"])) if state]
+    return [
+        ("db_pool_checked_out", "gauge", "DB connections currently checked out.",
+         [("db_pool_checked_out", {"engine": name}, state["checked_out"]) for name, state in engines]),
+        ("db_pool_checkouts_total", "counter", "DB connection checkouts.",
+         [("db_pool_checkouts_total", {}, db["checkouts"])]),
+        ("db_pool_checkout_wait_seconds_max", "gauge", "Longest wait for a DB connection.",
+         [("db_pool_checkout_wait_seconds_max", {}, db["checkout_wait_max_s"])]),
+        ("password_hash_in_flight", "gauge", "Password hashing jobs queued or running.",
+         [("password_hash_in_flight", {}, pw["in_flight"])]),
+        ("password_hash_rejected_total", "counter", "Password hashing jobs rejected (pool saturated).",
+         [("password_hash_rejected_total", {}, pw["rejected"])]),
+        ("password_hash_queue_wait_seconds_avg", "gauge", "Average wait for a hashing worker.",
+         [("password_hash_queue_wait_seconds_avg", {}, pw["queue_wait_avg_s"])]),
+    ]
+
+
+metrics.REGISTRY.register_collector(_pool_collector)
+metrics.REGISTRY.register_collector(tasks.collect_metrics)
+metrics.REGISTRY.register_collector(metrics.cache_collector(cache.CACHES))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of route, upstream, queue and pool metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,158 @@
+"""
+memory.py — Conversation Memory
+===============================
+
+Per-user DevBot conversation memory, persisted in the `memory` table.
+
+Responsibilities:
+- Load a bounded history for a user: one rolling summary + the most recent turns.
+- Record new turns (truncated) after each completed task.
+- Compact older turns into the rolling summary once the token budget is exceeded,
+  so prompt size stays flat across long multi-turn sessions.
+- Keep recent history cached in-process (LRU) to avoid a DB round trip per task.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, select
+
+from server.config import settings
+from server.database import AsyncSessionLocal
+from server.debug import debug_log
+from server.hf_client import summarize_conversation
+from server.models import Memory
+
+SUMMARY_ROLE = "summary"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token + per-message overhead)."""
+    return len(text) // 4 + 4
+
+
+class ConversationMemory:
+    def __init__(
+        self,
+        token_budget: int,
+        keep_recent: int,
+        turn_chars: int,
+        cache_size: int,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.turn_chars = turn_chars
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, dict]" = OrderedDict()
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    # ------------------------
+    # Cache helpers
+    # ------------------------
+    def _remember(self, user_id: int, state: dict):
+        self._cache[user_id] = state
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(user_id, asyncio.Lock())
+
+    async def _state(self, user_id: int) -> dict:
+        """Cached {summary, turns} for a user, loaded from the DB on a miss."""
+        state = self._cache.get(user_id)
+        if state is not None:
+            self._cache.move_to_end(user_id)
+            return state
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Memory).where(Memory.user_id == user_id).order_by(Memory.id)
+            )).scalars().all()
+
+        summary = None
+        turns = []
+        for row in rows:
+            if row.role == SUMMARY_ROLE:
+                summary = {"id": row.id, "content": row.content}
+            else:
+                turns.append({"id": row.id, "role": row.role, "content": row.content})
+
+        state = {"summary": summary, "turns": turns}
+        self._remember(user_id, state)
+        return state
+
+    # ------------------------
+    # Public API
+    # ------------------------
+    async def load(self, user_id: int) -> List[Dict[str, str]]:
+        """Return chat messages for the prompt: rolling summary first, then recent turns."""
+        state = await self._state(user_id)
+        messages = []
+        if state["summary"]:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{state['summary']['content']}",
+            })
+        messages.extend({"role": t["role"], "content": t["content"]} for t in state["turns"])
+        return messages
+
+    async def record(self, user_id: int, user_message: str, assistant_message: str):
+        """Persist a completed turn and compact history if it exceeds the budget."""
+        async with self._lock(user_id):
+            state = await self._state(user_id)
+
+            rows = [
+                Memory(user_id=user_id, role="user", content=user_message[:self.turn_chars]),
+                Memory(user_id=user_id, role="assistant", content=assistant_message[:self.turn_chars]),
+            ]
+            async with AsyncSessionLocal() as db:
+                db.add_all(rows)
+                await db.commit()
+            state["turns"].extend({"id": r.id, "role": r.role, "content": r.content} for r in rows)
+
+            used = sum(estimate_tokens(t["content"]) for t in state["turns"])
+            if used > self.token_budget and len(state["turns"]) > self.keep_recent:
+                await self._compact(user_id, state)
+
+    async def _compact(self, user_id: int, state: dict):
+        """Fold all but the most recent turns into the rolling summary."""
+        older = state["turns"][:-self.keep_recent] if self.keep_recent else state["turns"]
+        previous = state["summary"]["content"] if state["summary"] else None
+
+        summary_text = await asyncio.to_thread(
+            summarize_conversation, previous, older, settings.memory_summary_tokens
+        )
+
+        stale_ids = [t["id"] for t in older]
+        if state["summary"]:
+            stale_ids.append(state["summary"]["id"])
+
+        summary_row = Memory(user_id=user_id, role=SUMMARY_ROLE, content=summary_text)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Memory).where(Memory.id.in_(stale_ids)))
+            db.add(summary_row)
+            await db.commit()
+
+        state["summary"] = {"id": summary_row.id, "content": summary_row.content}
+        state["turns"] = state["turns"][len(older):]
+        debug_log("Conversation memory compacted", context={
+            "user_id": user_id, "compacted_turns": len(older), "summary_chars": len(summary_text),
+        })
+
+    def forget(self, user_id: Optional[int] = None):
+        """Drop cached history (one user, or everyone)."""
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
+
+
+conversation_memory = ConversationMemory(
+    token_budget=settings.memory_token_budget,
+    keep_recent=settings.memory_keep_recent,
+    turn_chars=settings.memory_turn_chars,
+    cache_size=settings.memory_cache_users,
+)
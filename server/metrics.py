@@ -0,0 +1,207 @@
+"""
+metrics.py — Prometheus-Style Metrics
+=====================================
+
+Minimal, dependency-free metrics registry rendered in the Prometheus text
+exposition format at `GET /metrics`.
+
+Responsibilities:
+- Counters, gauges and histograms with labels (thread-safe, cheap to update).
+- Collectors that snapshot state owned by other modules (DB pool, hashing
+  pool, caches) at scrape time instead of on every update.
+- The metric definitions shared by main.py, hf_client, github_service and tasks.
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+Sample = Tuple[str, Dict[str, str], float]  # (metric name, labels, value)
+
+# ----------------------------------------------------
+# Metric Types
+# ----------------------------------------------------
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            state["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+
+    def samples(self) -> List[Sample]:
+        out = []
+        with self._lock:
+            for key, state in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    out.append((f"{self.name}_bucket", {**labels, "le": repr(float(bound))}, cumulative))
+                cumulative += state["counts"][-1]
+                out.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, cumulative))
+                out.append((f"{self.name}_sum", labels, state["sum"]))
+                out.append((f"{self.name}_count", labels, cumulative))
+        return out
+
+# ----------------------------------------------------
+# Registry + Exposition
+# ----------------------------------------------------
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """Collector yields (name, kind, help, samples) tuples at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        families = [(m.name, m.kind, m.help, m.samples()) for m in self._metrics]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception:
+                continue  # a failing collector must not break the scrape
+
+        lines = []
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                if labels:
+                    rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    lines.append(f"{sample_name}{{{rendered}}} {_format(value)}")
+                else:
+                    lines.append(f"{sample_name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value is None:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# ----------------------------------------------------
+# Metric Definitions
+# ----------------------------------------------------
+# HTTP routes (main.py)
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency.", ["method", "route"])
+
+# Hugging Face (hf_client._query_hf)
+HF_REQUESTS = Counter("hf_requests_total", "Hugging Face requests by outcome.", ["model", "outcome"])
+HF_LATENCY = Histogram("hf_request_duration_seconds", "Hugging Face request latency (per attempt).", ["model"])
+HF_RETRIES = Counter("hf_retries_total", "Hugging Face retries.", ["model"])
+HF_TOKENS = Counter("hf_tokens_total", "Tokens reported by Hugging Face usage.", ["model", "kind"])
+HF_CIRCUIT_STATE = Gauge("hf_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ["model"])
+HF_HEDGES = Counter("hf_hedges_total", "Hedged HF requests by winning call.", ["model", "winner"])
+
+# GitHub (GitHubService._request)
+GITHUB_REQUESTS = Counter("github_requests_total", "GitHub API requests by status.", ["status"])
+GITHUB_LATENCY = Histogram("github_request_duration_seconds", "GitHub API request latency.")
+GITHUB_RATE_LIMIT_REMAINING = Gauge("github_rate_limit_remaining", "Last X-RateLimit-Remaining per token.", ["token"])
+GITHUB_RATE_LIMIT_RESET = Gauge("github_rate_limit_reset_timestamp", "X-RateLimit-Reset (epoch s) per token.", ["token"])
+GITHUB_RATE_LIMIT_WAITS = Counter("github_rate_limit_waits_total", "Requests deferred until a quota reset.")
+
+# Cache warming (warmer.py)
+CACHE_WARM_CHECKS = Counter("cache_warm_checks_total", "Cache warmer SHA checks by result.", ["result"])
+
+# Health probes (health.py)
+HEALTH_CHECK_STATUS = Gauge("health_check_status", "Last probe result (1 ok, 0.5 degraded, 0 down).", ["check"])
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "Latest event-loop scheduling lag sample.")
+
+# Tasks + SSE (tasks.py)
+TASKS_STARTED = Counter("tasks_started_total", "Tasks started by preset.", ["preset"])
+TASKS_FINISHED = Counter("tasks_finished_total", "Tasks finished by preset and status.", ["preset", "status"])
+TASK_DURATION = Histogram("task_duration_seconds", "End-to-end task duration.", ["preset"])
+TASKS_ACTIVE = Gauge("tasks_active", "Tasks currently running.")
+SSE_SUBSCRIBERS = Gauge("sse_subscribers", "Open SSE task streams.")
+
+# Audit (security.py)
+AUDIT_WRITE_LATENCY = Histogram("audit_write_duration_seconds", "Time to write + commit an audit row.")
+
+
+def cache_collector(caches: Dict[str, object]):
+    """Collector for LRUCache hit/miss counters and sizes."""
+    def collect():
+        hits = [("cache_requests_total", {"cache": n, "result": "hit"}, c.hits) for n, c in caches.items()]
+        misses = [("cache_requests_total", {"cache": n, "result": "miss"}, c.misses) for n, c in caches.items()]
+        sizes = [("cache_entries", {"cache": n}, len(c)) for n, c in caches.items()]
+        return [
+            ("cache_requests_total", "counter", "Cache lookups by result.", hits + misses),
+            ("cache_entries", "gauge", "Entries currently cached.", sizes),
+        ]
+    return collect
+
+
+def render() -> str:
+    return REGISTRY.render()
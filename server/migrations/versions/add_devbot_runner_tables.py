@@ -2,7 +2,7 @@
 Alembic migration script: Add DevBot Runner tables (tasks, logs, user_log, memory)
 
 Revision ID: add_devbot_runner_tables
-Revises: <put_previous_revision_here>
+Revises: 39bb02d908d7
 Create Date: 2025-09-14
 """
 
@@ -12,7 +12,7 @@ from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision = 'add_devbot_runner_tables'
-down_revision = None  # TODO: replace with actual previous revision id
+down_revision = '39bb02d908d7'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,40 @@
+"""
+Alembic migration script: Align memory table with models.Memory (role/content turns)
+
+Revision ID: conversation_memory
+Revises: partition_audit_logs
+Create Date: 2025-10-01
+
+Conversation memory is stored as one row per message (role = user / assistant)
+plus at most one rolling `summary` row per user.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'conversation_memory'
+down_revision = 'partition_audit_logs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memory') as batch:
+        batch.drop_column('data')
+        batch.drop_column('queue_num')
+        batch.add_column(sa.Column('role', sa.String(), nullable=False, server_default='user'))
+        batch.add_column(sa.Column('content', sa.Text(), nullable=False, server_default=''))
+        batch.add_column(sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()))
+    op.create_index('ix_memory_user_id_id', 'memory', ['user_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_memory_user_id_id', table_name='memory')
+    with op.batch_alter_table('memory') as batch:
+        batch.drop_column('created_at')
+        batch.drop_column('content')
+        batch.drop_column('role')
+        batch.add_column(sa.Column('data', postgresql.JSONB(), nullable=False, server_default='{}'))
+        batch.add_column(sa.Column('queue_num', sa.Integer(), nullable=False, server_default='0'))
@@ -0,0 +1,130 @@
+"""
+Alembic migration script: Partition audit_logs by month + add query indexes
+
+Revision ID: partition_audit_logs
+Revises: add_devbot_runner_tables
+Create Date: 2025-10-01
+
+On PostgreSQL, `audit_logs` becomes a RANGE-partitioned table (one partition per
+calendar month, plus a DEFAULT catch-all) so retention can drop whole partitions
+instead of running DELETE scans. On other dialects only the indexes are added.
+"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'partition_audit_logs'
+down_revision = 'add_devbot_runner_tables'
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3  # months pre-created beyond the current one
+
+
+def _month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def _next_month(dt: datetime) -> datetime:
+    return datetime(dt.year + (dt.month // 12), dt.month % 12 + 1, 1)
+
+
+def _create_indexes():
+    op.create_index('ix_audit_logs_timestamp', 'audit_logs', ['timestamp'])
+    op.create_index('ix_audit_logs_user_id_timestamp', 'audit_logs', ['user_id', 'timestamp'])
+    op.create_index('ix_audit_logs_action_timestamp', 'audit_logs', ['action', 'timestamp'])
+    op.create_index(
+        'ix_audit_logs_guest_timestamp', 'audit_logs', ['timestamp', 'action'],
+        postgresql_where=sa.text('user_id IS NULL'),
+    )
+
+
+def _drop_indexes():
+    op.drop_index('ix_audit_logs_guest_timestamp', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_action_timestamp', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_user_id_timestamp', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_timestamp', table_name='audit_logs')
+
+
+def upgrade():
+    op.create_index('ix_logs_task_id', 'logs', ['task_id'])
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        _create_indexes()
+        return
+
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_legacy')
+    op.execute('ALTER SEQUENCE IF EXISTS audit_logs_id_seq RENAME TO audit_logs_legacy_id_seq')
+    op.execute('ALTER INDEX IF EXISTS ix_audit_logs_id RENAME TO ix_audit_logs_legacy_id')
+
+    # Partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+            user_id INTEGER REFERENCES users (id),
+            action VARCHAR NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute('CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT')
+
+    oldest = bind.execute(sa.text('SELECT MIN(timestamp) FROM audit_logs_legacy')).scalar()
+    start = _month_start(oldest or datetime.utcnow())
+    end = _month_start(datetime.utcnow())
+    for _ in range(PARTITIONS_AHEAD):
+        end = _next_month(end)
+
+    month = start
+    while month <= end:
+        upper = _next_month(month)
+        op.execute(
+            f"CREATE TABLE audit_logs_y{month:%Y}m{month:%m} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+        )
+        month = upper
+
+    op.execute("""
+        INSERT INTO audit_logs (id, user_id, action, timestamp)
+        SELECT id, user_id, action, COALESCE(timestamp, now()) FROM audit_logs_legacy
+    """)
+    op.execute("""
+        SELECT setval(pg_get_serial_sequence('audit_logs', 'id'), COALESCE(MAX(id), 0) + 1, false)
+        FROM audit_logs
+    """)
+    op.execute('DROP TABLE audit_logs_legacy')
+
+    _create_indexes()
+
+
+def downgrade():
+    op.drop_index('ix_logs_task_id', table_name='logs')
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        _drop_indexes()
+        return
+
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_partitioned')
+    op.create_table(
+        'audit_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_audit_logs_id'), 'audit_logs', ['id'], unique=False)
+    op.execute("""
+        INSERT INTO audit_logs (id, user_id, action, timestamp)
+        SELECT id, user_id, action, timestamp FROM audit_logs_partitioned
+    """)
+    op.execute("""
+        SELECT setval(pg_get_serial_sequence('audit_logs', 'id'), COALESCE(MAX(id), 0) + 1, false)
+        FROM audit_logs
+    """)
+    op.execute('DROP TABLE audit_logs_partitioned CASCADE')
@@ -0,0 +1,40 @@
+"""
+Alembic migration script: Checkpoint DevBot tasks (output, guest tasks, resume lookup)
+
+Revision ID: task_checkpoints
+Revises: users_status_index
+Create Date: 2025-10-12
+
+Tasks are now written to `tasks` / `logs` (see server/task_store.py) so they
+survive restarts: adds the `context` and `output` columns, allows guest tasks
+(nullable `user_id`), and indexes `status` (interrupted tasks are resumed).
+`logs.task_id` is already indexed by `partition_audit_logs`.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'task_checkpoints'
+down_revision = 'users_status_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks') as batch:
+        batch.add_column(sa.Column('context', sa.Text(), nullable=True))
+        batch.add_column(sa.Column('output', sa.Text(), nullable=True))
+        batch.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+    op.create_index('ix_tasks_status', 'tasks', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_tasks_status', table_name='tasks')
+    op.execute("DELETE FROM user_log WHERE task_id IN (SELECT id FROM tasks WHERE user_id IS NULL)")
+    op.execute("DELETE FROM logs WHERE task_id IN (SELECT id FROM tasks WHERE user_id IS NULL)")
+    op.execute("DELETE FROM tasks WHERE user_id IS NULL")
+    with op.batch_alter_table('tasks') as batch:
+        batch.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch.drop_column('output')
+        batch.drop_column('context')
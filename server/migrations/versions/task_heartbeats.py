@@ -0,0 +1,28 @@
+"""
+Alembic migration script: Heartbeat column for checkpointed tasks
+
+Revision ID: task_heartbeats
+Revises: task_checkpoints
+Create Date: 2025-10-14
+
+Live instances bump `heartbeat_at` on the tasks they run; pending / running
+tasks whose heartbeat goes stale belonged to an instance that died without
+draining and are marked interrupted (see task_store.interrupt_stale).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'task_heartbeats'
+down_revision = 'task_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('tasks', sa.Column('heartbeat_at', sa.DateTime(), server_default=sa.func.now()))
+
+
+def downgrade():
+    op.drop_column('tasks', 'heartbeat_at')
@@ -0,0 +1,26 @@
+"""
+Alembic migration script: Index users by (status, id) for keyset-paginated admin listing
+
+Revision ID: users_status_index
+Revises: conversation_memory
+Create Date: 2025-10-08
+
+`GET /auth/users?status=pending&after_id=N` seeks on (status, id) instead of
+scanning and sorting the whole users table.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'users_status_index'
+down_revision = 'conversation_memory'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_status_id', 'users', ['status', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_users_status_id', table_name='users')
@@ -6,7 +6,7 @@ Defines all SQLAlchemy ORM models for the AI Dev Federation backend.
 Tables:
 - User: Registered users (with roles + status).
 - AuditLog: Records all actions (nullable user_id for guests).
-- Task: Execution tasks (linked to user + logs).
+- Task: Execution tasks (linked to user + logs; checkpointed by task_store).
 - Log: System-generated logs for tasks.
 - UserLog: User interaction logs (per task).
 - Memory: Conversation memory storage (per user).
@@ -14,7 +14,7 @@ Tables:
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -29,13 +29,16 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     role = Column(String, default="member")   # guest, member, admin
-    status = Column(String, default="pending")  # pending, approved
+    status = Column(String, default="pending")  # pending, approved, rejected
     created_at = Column(DateTime, default=datetime.utcnow)
 
     audit_logs = relationship("AuditLog", back_populates="user")
     tasks = relationship("Task", back_populates="user")
     memories = relationship("Memory", back_populates="user")
 
+    # Admin listing: keyset pagination by id within a status (see auth.list_users)
+    __table_args__ = (Index("ix_users_status_id", "status", "id"),)
+
 # ----------------------------------------------------
 # Audit & Logging
 # ----------------------------------------------------
@@ -49,12 +52,20 @@ class AuditLog(Base):
 
     user = relationship("User", back_populates="audit_logs")
 
+    # On PostgreSQL the table is RANGE-partitioned by month (see partition_audit_logs migration)
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp", "timestamp"),
+        Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp"),
+        Index("ix_audit_logs_guest_timestamp", "timestamp", "action", postgresql_where=text("user_id IS NULL")),
+    )
+
 
 class Log(Base):
     __tablename__ = "logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     message = Column(Text, nullable=False)
 
@@ -78,16 +89,21 @@ class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # nullable for guests
     type = Column(String, nullable=False)  # structure, file, brainstorm
-    status = Column(String, default="pending")  # pending, running, completed, failed
+    status = Column(String, default="pending")  # pending, running, completed, failed, interrupted
     created_at = Column(DateTime, default=datetime.utcnow)
     context = Column(Text, nullable=True)
+    output = Column(Text, nullable=True)
+    heartbeat_at = Column(DateTime, default=datetime.utcnow)  # bumped while a live instance runs the task
 
     user = relationship("User", back_populates="tasks")
     logs = relationship("Log", back_populates="task")
     user_logs = relationship("UserLog", back_populates="task")
 
+    # Startup / lazy resume looks up interrupted tasks (see task_store.interrupted_ids)
+    __table_args__ = (Index("ix_tasks_status", "status"),)
+
 # ----------------------------------------------------
 # Memory / Context
 # ----------------------------------------------------
@@ -101,3 +117,5 @@ class Memory(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="memories")
+
+    __table_args__ = (Index("ix_memory_user_id_id", "user_id", "id"),)
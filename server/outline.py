@@ -0,0 +1,382 @@
+"""
+outline.py — File Symbol Outlines
+=================================
+
+Compact symbol outlines of source files (imports, classes, functions,
+exports, with line ranges), so the dashboard and DevBot prompts can work
+from a file's shape instead of its full text.
+
+Responsibilities:
+- Python: outline via the standard `ast` module (signatures included).
+- TypeScript / JavaScript (incl. TSX / JSX): a lightweight tokenizer that
+  masks comments, strings and regexes, tracks nesting depth and matches
+  top-level declarations and class members.
+- Cache outlines per blob SHA (content-addressed, never stale).
+- Render an outline as compact prompt text.
+"""
+
+import ast
+import os
+import re
+from typing import List, Optional
+
+from typing_extensions import NotRequired, TypedDict
+
+from server.cache import LRUCache
+from server.debug import debug_log
+from server.tracing import span
+
+# ----------------------------------------------------
+# Shapes + Config
+# ----------------------------------------------------
+class OutlineSymbol(TypedDict):
+    kind: str  # import | function | class | method | variable | interface | type | enum | export
+    name: str
+    start_line: int
+    end_line: int
+    exported: bool
+    detail: NotRequired[str]  # signature / imported names
+    children: NotRequired[List["OutlineSymbol"]]
+
+
+class FileOutline(TypedDict):
+    repo: str
+    branch: str
+    path: str
+    blob_sha: str
+    language: str
+    symbols: List[OutlineSymbol]
+
+
+LANGUAGES = {
+    ".py": "python",
+    ".ts": "typescript", ".tsx": "typescript", ".mts": "typescript", ".cts": "typescript",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+}
+
+_outline_cache = LRUCache(maxsize=1024, name="file_outline")  # (blob_sha, language) → symbols
+
+
+class UnsupportedLanguage(ValueError):
+    """No outliner for this file type."""
+
+
+def language_for(path: str) -> Optional[str]:
+    return LANGUAGES.get(os.path.splitext(path)[1].lower())
+
+
+def _symbol(kind: str, name: str, start: int, end: int, exported: bool, **extra) -> OutlineSymbol:
+    return {"kind": kind, "name": name, "start_line": start, "end_line": end, "exported": exported, **extra}
+
+# ----------------------------------------------------
+# Python (ast)
+# ----------------------------------------------------
+def _python_all(tree: ast.Module) -> Optional[set]:
+    """Names listed in a literal module-level `__all__`, if any."""
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            try:
+                return set(ast.literal_eval(node.value))
+            except ValueError:
+                return None
+    return None
+
+
+def _public_member(name: str) -> bool:
+    """Underscore rule for class members (`__all__` only governs module-level names); dunders are public."""
+    return not name.startswith("_") or (name.startswith("__") and name.endswith("__"))
+
+
+def _python_node(node: ast.AST, public, in_class: bool = False) -> Optional[OutlineSymbol]:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        prefix = "async " if isinstance(node, ast.AsyncFunctionDef) else ""
+        returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+        return _symbol(
+            "method" if in_class else "function", node.name, node.lineno, node.end_lineno, public(node.name),
+            detail=f"{prefix}({ast.unparse(node.args)}){returns}",
+        )
+    if isinstance(node, ast.ClassDef):
+        children = [c for c in (_python_node(n, _public_member, in_class=True) for n in node.body) if c]
+        bases = ", ".join(ast.unparse(b) for b in node.bases)
+        return _symbol("class", node.name, node.lineno, node.end_lineno, public(node.name),
+                       detail=f"({bases})" if bases else "", children=children)
+    return None
+
+
+def python_outline(source: str) -> List[OutlineSymbol]:
+    tree = ast.parse(source)
+    exports = _python_all(tree)
+    public = (lambda name: name in exports) if exports is not None else (lambda name: not name.startswith("_"))
+
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                symbols.append(_symbol("import", alias.name, node.lineno, node.end_lineno, False,
+                                       detail=f"as {alias.asname}" if alias.asname else ""))
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            names = ", ".join(a.name + (f" as {a.asname}" if a.asname else "") for a in node.names)
+            symbols.append(_symbol("import", module, node.lineno, node.end_lineno, False, detail=names))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name) and target.id != "__all__":
+                    symbols.append(_symbol("variable", target.id, node.lineno, node.end_lineno, public(target.id)))
+        else:
+            symbol = _python_node(node, public)
+            if symbol:
+                symbols.append(symbol)
+    return symbols
+
+# ----------------------------------------------------
+# TypeScript / JavaScript (tokenizer)
+# ----------------------------------------------------
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%~^") | {""}  # not `<`: JSX closing tags (`</div>`)
+
+_REGEX_KEYWORDS = {"return", "typeof", "case", "in", "of", "instanceof", "new", "delete", "void", "throw",
+                   "yield", "await", "else", "do"}
+
+_TS_DECLARATIONS = [
+    ("function", re.compile(r"^(export\s+)?(default\s+)?(?:declare\s+)?(?:async\s+)?function\s*\*?\s*([\w$]*)")),
+    ("class", re.compile(r"^(export\s+)?(default\s+)?(?:declare\s+)?(?:abstract\s+)?class\s+([\w$]+)")),
+    ("interface", re.compile(r"^(export\s+)?(default\s+)?(?:declare\s+)?interface\s+([\w$]+)")),
+    ("type", re.compile(r"^(export\s+)?(default\s+)?(?:declare\s+)?type\s+([\w$]+)\s*(?:<|=)")),
+    ("enum", re.compile(r"^(export\s+)?(default\s+)?(?:declare\s+)?(?:const\s+)?enum\s+([\w$]+)")),
+    ("variable", re.compile(r"^(export\s+)?(default\s+)?(?:declare\s+)?(?:const|let|var)\s+([\w$]+)")),
+]
+_TS_EXPORT = re.compile(r"^export\s+(default\b|\*|\{)")
+_TS_MEMBER = re.compile(
+    r"^(?:(?:public|private|protected|static|readonly|async|override|abstract|get|set)\s+)*"
+    r"(\*?\s*#?[\w$]+)\s*(?:<[^>]*>)?\s*\("
+)
+_TS_KEYWORDS = {"if", "for", "while", "switch", "catch", "return", "function", "new", "await", "super", "typeof"}
+_TS_SPECIFIER = re.compile(r"""(?:from\s+|^import\s+|require\()\s*(['"])(.+?)\1""")
+_TS_CONTINUES = ("=", ",", "=>", "(", "[", "{", "+", "-", "*", "/", "&&", "||", "?", ":", "|", "&")
+
+
+def _mask_ts(source: str) -> str:
+    """Blank out comments, string / template text and regex literals (newlines and `${}` braces kept)."""
+    out = list(source)
+    n = len(source)
+    braces = []  # one entry per open `{`: True when it is a template `${` placeholder
+
+    def blank(start, end):
+        for k in range(start, min(end, n)):
+            if out[k] != "\n":
+                out[k] = " "
+
+    def template(start):
+        """Mask template text from `start`; returns (next index, opened a `${` placeholder)."""
+        j = start
+        while j < n:
+            if source[j] == "\\":
+                j += 2
+            elif source[j] == "`":
+                blank(start, j)
+                return j + 1, False
+            elif source.startswith("${", j):
+                blank(start, j + 1)  # `$` blanked, `{` kept to balance the placeholder's `}`
+                return j + 2, True
+            else:
+                j += 1
+        blank(start, n)
+        return n, False
+
+    i, prev = 0, ""  # prev: last significant character ("a" for identifiers / literals, "(" for keywords)
+    while i < n:
+        c = source[i]
+        if source.startswith("//", i):
+            end = source.find("\n", i)
+            end = n if end == -1 else end
+            blank(i, end)
+            i = end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            blank(i, end)
+            i = end
+        elif c in "'\"":
+            j = i + 1
+            while j < n and source[j] not in (c, "\n"):
+                j += 2 if source[j] == "\\" else 1
+            blank(i + 1, j)
+            i, prev = j + 1, "a"
+        elif c == "`" or (c == "}" and braces and braces[-1]):
+            if c == "}":
+                braces.pop()
+            i, opened = template(i + 1)
+            if opened:
+                braces.append(True)
+            prev = "{" if opened else "a"
+        elif c == "/" and prev in _REGEX_PRECEDERS:
+            j, in_class = i + 1, False
+            while j < n and source[j] != "\n":
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] == "[":
+                    in_class = True
+                elif source[j] == "]":
+                    in_class = False
+                elif source[j] == "/" and not in_class:
+                    break
+                j += 1
+            if j < n and source[j] == "/":
+                blank(i + 1, j)
+                i, prev = j + 1, "a"
+            else:  # no closing slash on the line: division after all
+                i, prev = i + 1, "/"
+        elif c.isalnum() or c in "_$":
+            j = i + 1
+            while j < n and (source[j].isalnum() or source[j] in "_$"):
+                j += 1
+            prev = "(" if source[i:j] in _REGEX_KEYWORDS else "a"  # `return /re/` vs `x / y`
+            i = j
+        else:
+            if c == "{":
+                braces.append(False)
+            elif c == "}" and braces:
+                braces.pop()
+            if not c.isspace():
+                prev = c
+            i += 1
+    return "".join(out)
+
+
+def _line_depths(lines: List[str]) -> List[int]:
+    """Nesting depth ((), [], {}) at the start of each masked line."""
+    depths, depth = [], 0
+    for line in lines:
+        depths.append(depth)
+        for c in line:
+            if c in "([{":
+                depth += 1
+            elif c in ")]}":
+                depth = max(depth - 1, 0)
+    depths.append(depth)
+    return depths
+
+
+def _statement_end(lines: List[str], depths: List[int], start: int, base: int) -> int:
+    """Index of the last line of the statement starting at `start` (at nesting depth `base`)."""
+    for j in range(start, len(lines)):
+        stripped = lines[j].strip()
+        if depths[j + 1] <= base and not stripped.endswith(_TS_CONTINUES):
+            nxt = next((lines[k].strip() for k in range(j + 1, len(lines)) if lines[k].strip()), "")
+            if not nxt.startswith((".", "?", ":", "=>", "&&", "||", "+", "|", "&")):
+                return j
+    return len(lines) - 1
+
+
+def ts_outline(source: str) -> List[OutlineSymbol]:
+    raw_lines = source.splitlines()
+    lines = _mask_ts(source).splitlines()
+    depths = _line_depths(lines)
+    symbols = []
+
+    i = 0
+    while i < len(lines):
+        text = lines[i].strip()
+        if depths[i] != 0 or not text:
+            i += 1
+            continue
+        end = _statement_end(lines, depths, i, 0)
+        statement = " ".join(l.strip() for l in lines[i:end + 1])
+
+        if text.startswith("import ") or text.startswith("import{"):
+            original = " ".join(l.strip() for l in raw_lines[i:end + 1])
+            spec = _TS_SPECIFIER.search(original)
+            names = statement.split(" from ")[0].removeprefix("import").strip()
+            symbols.append(_symbol("import", spec.group(2) if spec else names, i + 1, end + 1, False,
+                                   detail=re.sub(r"\s+", " ", names)))
+        else:
+            for kind, pattern in _TS_DECLARATIONS:
+                match = pattern.match(text)
+                if not match:
+                    continue
+                exported, default, name = bool(match.group(1)), bool(match.group(2)), match.group(3)
+                if kind == "variable" and re.search(r"=\s*(?:async\s*)?(?:\([^)]*\)|[\w$]+)\s*(?::[^=]+)?=>|=\s*(?:async\s+)?function\b", statement):
+                    kind = "function"
+                symbol = _symbol(kind, name or "default", i + 1, end + 1, exported or default)
+                if kind == "class":
+                    symbol["children"] = _ts_members(lines, depths, i, end)
+                symbols.append(symbol)
+                break
+            else:
+                if _TS_EXPORT.match(text):
+                    clause = raw_lines[i].strip()[len("export"):].strip().rstrip(";")
+                    symbols.append(_symbol("export", clause[:80], i + 1, end + 1, True))
+        i = end + 1
+    return symbols
+
+
+def _ts_members(lines: List[str], depths: List[int], start: int, end: int) -> List[OutlineSymbol]:
+    """Methods / constructor declared directly in a class body (depth 1)."""
+    members, i = [], start + 1
+    while i <= end:
+        text = lines[i].strip()
+        match = _TS_MEMBER.match(text) if depths[i] == 1 else None
+        if match and match.group(1).lstrip("*# ") not in _TS_KEYWORDS:
+            member_end = min(_statement_end(lines, depths, i, 1), end)
+            name = match.group(1).replace(" ", "")
+            members.append(_symbol("method", name, i + 1, member_end + 1, not name.startswith("#")))
+            i = member_end + 1
+            continue
+        i += 1
+    return members
+
+# ----------------------------------------------------
+# Public API
+# ----------------------------------------------------
+def outline_source(source: str, language: str) -> List[OutlineSymbol]:
+    if language == "python":
+        return python_outline(source)
+    if language in ("typescript", "javascript"):
+        return ts_outline(source)
+    raise UnsupportedLanguage(f"No outline support for {language}")
+
+
+def get_file_outline(github_service, owner: str, repo: str, path: str, branch: Optional[str] = None) -> FileOutline:
+    """Outline of `path` at the branch head (cached per blob SHA, so unchanged files are free)."""
+    language = language_for(path)
+    if language is None:
+        raise UnsupportedLanguage(f"No outline support for {path}")
+
+    branch, sha = github_service.resolve_sha(owner, repo, branch)
+    entry = next(
+        (e for e in github_service.get_tree_entries(owner, repo, sha) if e["path"] == path and e.get("type") == "blob"),
+        None,
+    )
+    if entry is None:
+        raise FileNotFoundError(path)
+
+    key = (entry["sha"], language)
+    symbols = _outline_cache.get(key)
+    if symbols is None:
+        with span("outline.parse", path=path):
+            symbols = outline_source(github_service.get_blob_content(owner, repo, entry["sha"]), language)
+        _outline_cache.set(key, symbols)
+        debug_log("File outline built", context={"path": path, "blob_sha": entry["sha"], "symbols": len(symbols)})
+
+    return {"repo": f"{owner}/{repo}", "branch": branch, "path": path, "blob_sha": entry["sha"],
+            "language": language, "symbols": symbols}
+
+
+def format_outline(outline: FileOutline) -> str:
+    """Compact prompt text: imports on one line, then one line per symbol (members indented)."""
+    imports = [s["name"] for s in outline["symbols"] if s["kind"] == "import"]
+    lines = [f"Outline of {outline['path']} ({outline['language']}):"]
+    if imports:
+        lines.append("imports: " + ", ".join(dict.fromkeys(imports)))
+
+    def _emit(symbol, indent):
+        export = "export " if symbol["exported"] and symbol["kind"] != "export" and outline["language"] != "python" else ""
+        lines.append(f"{indent}{export}{symbol['kind']} {symbol['name']}{symbol.get('detail', '')} "
+                     f"(L{symbol['start_line']}-{symbol['end_line']})")
+        for child in symbol.get("children", []):
+            _emit(child, indent + "  ")
+
+    for symbol in outline["symbols"]:
+        if symbol["kind"] != "import":
+            _emit(symbol, "")
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+"""
+resilience.py — Upstream Failure Handling
+=========================================
+
+Shared building blocks for calling flaky upstreams (Hugging Face today).
+
+Responsibilities:
+- Circuit breaker: open after consecutive failures, fail fast while open, and
+  let a single probe through after a cool-down (half-open).
+- Retry budget: cap retries to a fraction of recent requests, so an outage
+  does not multiply upstream load.
+- Backoff helpers: decorrelated jitter and `Retry-After` parsing.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+# ----------------------------------------------------
+# Circuit Breaker
+# ----------------------------------------------------
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may proceed (always when closed; one probe when half-open)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit admits its next probe."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+# ----------------------------------------------------
+# Retry Budget
+# ----------------------------------------------------
+class RetryBudget:
+    """Retries allowed over a sliding window: `min_retries` + `ratio` × requests."""
+
+    def __init__(self, ratio: float, min_retries: int, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+# ----------------------------------------------------
+# Backoff Helpers
+# ----------------------------------------------------
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """Next sleep: uniform in [base, 3 × previous], capped (AWS "decorrelated jitter")."""
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date); None if absent/invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
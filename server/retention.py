@@ -0,0 +1,116 @@
+"""
+retention.py — Audit Log Retention
+==================================
+
+Maintains the monthly partitions of `audit_logs` (PostgreSQL only).
+
+Responsibilities:
+- Pre-create upcoming monthly partitions so inserts never land in the DEFAULT partition.
+- Drop partitions older than the retention window (no DELETE scans).
+- Run periodically in the background, or once via `python -m server.retention`.
+"""
+
+import asyncio
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+
+from server.config import settings
+from server.database import engine
+from server.debug import debug_log
+
+PARTITION_RE = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+def _month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    index = dt.year * 12 + (dt.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: datetime) -> str:
+    return f"audit_logs_y{month:%Y}m{month:%m}"
+
+
+def _existing_partitions(conn) -> list[str]:
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = 'audit_logs'
+    """))
+    return [row[0] for row in rows]
+
+# ----------------------------------------------------
+# Public API
+# ----------------------------------------------------
+def ensure_audit_partitions(conn, months_ahead: int, now: datetime | None = None) -> list[str]:
+    """Create partitions for the current month + `months_ahead` (idempotent)."""
+    existing = set(_existing_partitions(conn))
+    current = _month_start(now or datetime.utcnow())
+    created = []
+
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        name = _partition_name(month)
+        if name in existing:
+            continue
+        upper = _add_months(month, 1)
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+        ))
+        created.append(name)
+    return created
+
+
+def drop_expired_audit_partitions(conn, retention_months: int, now: datetime | None = None) -> list[str]:
+    """Detach + drop monthly partitions that end before the retention cutoff."""
+    cutoff = _add_months(_month_start(now or datetime.utcnow()), -retention_months)
+    dropped = []
+
+    for name in _existing_partitions(conn):
+        match = PARTITION_RE.match(name)
+        if not match:
+            continue  # DEFAULT partition and anything unexpected are left alone
+        month = datetime(int(match.group(1)), int(match.group(2)), 1)
+        if _add_months(month, 1) <= cutoff:
+            conn.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def run_retention() -> dict:
+    """One maintenance pass: pre-create upcoming partitions, drop expired ones."""
+    if engine.dialect.name != "postgresql":
+        return {"skipped": f"partitioning not supported on {engine.dialect.name}"}
+
+    with engine.begin() as conn:
+        created = ensure_audit_partitions(conn, settings.audit_partitions_ahead)
+        dropped = drop_expired_audit_partitions(conn, settings.audit_retention_months)
+
+    result = {"created": created, "dropped": dropped}
+    debug_log("Audit log retention pass", context=result)
+    return result
+
+
+async def retention_loop():
+    """Background task: run retention every AUDIT_RETENTION_INTERVAL seconds."""
+    while True:
+        try:
+            await asyncio.to_thread(run_retention)
+        except Exception as e:
+            debug_log("Audit log retention failed", e)
+        await asyncio.sleep(settings.audit_retention_interval)
+
+
+if __name__ == "__main__":
+    print(run_retention())
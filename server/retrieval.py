@@ -0,0 +1,213 @@
+"""
+retrieval.py — Lexical Code Retrieval
+=====================================
+
+Local BM25 index over a repository's text files, used to send only the most
+relevant code to the model instead of whole files or trees.
+
+Responsibilities:
+- Split identifiers (camelCase, snake_case, paths) into search tokens.
+- Chunk files into fixed line windows and build an inverted index per commit SHA.
+- Score chunks with BM25 and format the top-k as prompt context.
+- Cache built indexes per (repo, commit SHA), and tokenized chunks per blob SHA,
+  so indexing a new commit only fetches + tokenizes the blobs that changed.
+  An index missing files (failed fetches) is never cached: the next call retries.
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from server.cache import LRUCache
+from server.config import settings
+from server.debug import debug_log
+from server.tracing import span
+
+# ----------------------------------------------------
+# Config
+# ----------------------------------------------------
+TEXT_EXTENSIONS = {
+    ".py", ".ts", ".tsx", ".js", ".jsx", ".md", ".json", ".yaml", ".yml", ".toml",
+    ".css", ".html", ".txt", ".cfg", ".ini", ".sh", ".sql", ".mako",
+}
+TEXT_FILENAMES = {"Dockerfile", "Makefile", "README"}
+SKIP_FILENAMES = {"package-lock.json", "yarn.lock", "pnpm-lock.yaml"}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "are", "you", "not", "but",
+    "what", "how", "can", "does", "into", "its", "our", "use", "any", "all", "has",
+}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+PATH_MATCH_BOOST = 10.0  # added when the query names a file path verbatim
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# ----------------------------------------------------
+# Tokenization
+# ----------------------------------------------------
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase tokens, breaking identifiers on case and underscores."""
+    tokens = []
+    for ident in _IDENT_RE.findall(text):
+        parts = [p.lower() for piece in ident.split("_") for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.append(ident.lower().strip("_"))
+        tokens.extend(parts)
+    return [t for t in tokens if len(t) > 1 and t not in STOPWORDS]
+
+
+def is_indexable(path: str, size: int) -> bool:
+    name = os.path.basename(path)
+    if name in SKIP_FILENAMES or size > settings.retrieval_max_file_bytes:
+        return False
+    return name in TEXT_FILENAMES or os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS
+
+# ----------------------------------------------------
+# Index
+# ----------------------------------------------------
+@dataclass
+class Chunk:
+    path: str
+    start_line: int
+    end_line: int
+    text: str
+
+
+def chunk_file(path: str, content: str, chunk_lines: int) -> List[Chunk]:
+    lines = content.splitlines()
+    return [
+        Chunk(path, start + 1, min(start + chunk_lines, len(lines)), "\n".join(lines[start:start + chunk_lines]))
+        for start in range(0, len(lines), chunk_lines)
+    ]
+
+
+def tokenize_chunk(chunk: Chunk) -> Counter:
+    return Counter(tokenize(chunk.path) + tokenize(chunk.text))
+
+
+class BM25Index:
+    """Inverted index (term → [(chunk_id, tf)]) with BM25 scoring."""
+
+    def __init__(self, docs: List[Tuple[Chunk, Counter]]):
+        self.chunks = [chunk for chunk, _ in docs]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.paths: Dict[str, List[int]] = {}
+
+        for chunk_id, (chunk, counts) in enumerate(docs):
+            self.paths.setdefault(chunk.path, []).append(chunk_id)
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((chunk_id, tf))
+
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def search(self, query: str, top_k: int) -> List[Tuple[float, Chunk]]:
+        n_docs = len(self.chunks)
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        for path, chunk_ids in self.paths.items():
+            if path in query:
+                for chunk_id in chunk_ids:
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + PATH_MATCH_BOOST
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in best]
+
+# ----------------------------------------------------
+# Build + Cache (per commit SHA)
+# ----------------------------------------------------
+_indexes = LRUCache(maxsize=8, name="retrieval_index")
+_blob_docs = LRUCache(maxsize=4096, name="retrieval_blob_docs")  # (blob_sha, path) → [(Chunk, term counts)]
+_build_lock = threading.Lock()  # concurrent tasks on a cold SHA build the index once
+
+
+class IndexIncomplete(RuntimeError):
+    """Some files could not be fetched; the index is not cached so the next call retries."""
+
+
+def build_index(github_service, owner: str, repo: str, sha: str) -> BM25Index:
+    entries = [
+        e for e in github_service.get_tree_entries(owner, repo, sha)
+        if e.get("type") == "blob" and is_indexable(e["path"], e.get("size", 0))
+    ][:settings.retrieval_max_files]
+
+    def _docs(entry):
+        """(docs, outcome) with outcome "cached", "fetched" or "failed" (failures are never cached)."""
+        key = (entry["sha"], entry["path"])
+        docs = _blob_docs.get(key)
+        if docs is not None:
+            return docs, "cached"
+        try:
+            content = github_service.get_blob_content(owner, repo, entry["sha"])
+        except Exception as e:
+            debug_log("Retrieval blob fetch failed", e, context={"path": entry["path"]})
+            return [], "failed"
+        docs = [(c, tokenize_chunk(c)) for c in chunk_file(entry["path"], content, settings.retrieval_chunk_lines)]
+        _blob_docs.set(key, docs)
+        return docs, "fetched"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(_docs, entries))
+
+    outcomes = {"cached": 0, "fetched": 0, "failed": 0}
+    for _, outcome in results:
+        outcomes[outcome] += 1
+    context = {"repo": f"{owner}/{repo}", "sha": sha, "files": len(entries), **{f"blobs_{k}": v for k, v in outcomes.items()}}
+
+    # A partial index must never be cached under the immutable SHA key
+    if outcomes["failed"]:
+        debug_log("Retrieval index incomplete, not cached", context=context)
+        raise IndexIncomplete(f"{outcomes['failed']} of {len(entries)} files could not be fetched for {owner}/{repo}@{sha}")
+
+    index = BM25Index([doc for docs, _ in results for doc in docs])
+    debug_log("Retrieval index built", context={**context, "chunks": len(index.chunks)})
+    return index
+
+
+def get_index(github_service, owner: str, repo: str, sha: str) -> BM25Index:
+    index = _indexes.get((owner, repo, sha))
+    if index is None:
+        with _build_lock:
+            index = _indexes.get_or_set((owner, repo, sha), lambda: build_index(github_service, owner, repo, sha))
+    return index
+
+
+def retrieve_context(
+    github_service,
+    owner: str,
+    repo: str,
+    query: str,
+    branch: Optional[str] = None,
+    top_k: Optional[int] = None,
+) -> str:
+    """Top-k relevant chunks for `query`, formatted as prompt context ("" if nothing matches)."""
+    with span("github.resolve_sha"):
+        _, sha = github_service.resolve_sha(owner, repo, branch)
+    with span("retrieval.index"):
+        index = get_index(github_service, owner, repo, sha)
+    with span("retrieval.search", chunks=len(index.chunks)):
+        results = index.search(query, top_k or settings.retrieval_top_k)
+
+    return "\n\n".join(
+        f"File: {chunk.path} (lines {chunk.start_line}-{chunk.end_line})\n{chunk.text}"
+        for _, chunk in results
+    )
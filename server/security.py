@@ -11,21 +11,31 @@ Responsibilities:
 """
 
 import os
-import yaml
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 
-from server.database import get_db
+from server import metrics
+from server.database import AsyncSessionLocal
 from server.models import AuditLog
 
 # ----------------------------------------------------
 # Config
 # ----------------------------------------------------
 ALLOWLIST_PATH = os.path.join(os.path.dirname(__file__), "..", "config", "endpoint_allowlist.yaml")
-with open(ALLOWLIST_PATH, "r") as f:
-    ALLOWLIST = yaml.safe_load(f)
+
+
+@lru_cache(maxsize=1)
+def get_allowlist() -> dict:
+    """Endpoint allowlist, read (and yaml imported) on first use rather than at import."""
+    import yaml
+
+    with open(ALLOWLIST_PATH, "r") as f:
+        return yaml.safe_load(f)
+
 
 GUEST_LIMIT = 5  # guest users: tasks per minute
 
@@ -41,8 +51,6 @@ class SecurityMiddleware(BaseHTTPMiddleware):
     """
 
     async def dispatch(self, request: Request, call_next):
-        db: Session = next(get_db())
-
         # Resolve user role (guest if unauthenticated)
         user = getattr(request.state, "user", None)
         role = user["role"] if user else "guest"
@@ -53,28 +61,31 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         if path.startswith("/auth/"):
             return await call_next(request)
 
-        # Guest rate limiting
-        if role == "guest" and path.startswith("/tasks/run"):
-            one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
-            task_count = (
-                db.query(AuditLog)
-                .filter(
-                    AuditLog.user_id.is_(None),  # guests logged with NULL user_id
-                    AuditLog.timestamp >= one_minute_ago,
-                    AuditLog.action.like("TASK_%"),
+        async with AsyncSessionLocal() as db:
+            # Guest rate limiting
+            if role == "guest" and path.startswith("/tasks/run"):
+                one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
+                task_count = await db.scalar(
+                    select(func.count())
+                    .select_from(AuditLog)
+                    .where(
+                        AuditLog.user_id.is_(None),  # guests logged with NULL user_id
+                        AuditLog.timestamp >= one_minute_ago,
+                        AuditLog.action.like("TASK_%"),
+                    )
                 )
-                .count()
+                if task_count >= GUEST_LIMIT:
+                    raise HTTPException(status_code=429, detail="❌ Guest rate limit exceeded (5 tasks/min)")
+
+            # Audit log
+            audit_start = time.perf_counter()
+            log = AuditLog(
+                user_id=user["id"] if user else None,
+                action=f"{method} {path}",
+                timestamp=datetime.utcnow(),
             )
-            if task_count >= GUEST_LIMIT:
-                raise HTTPException(status_code=429, detail="❌ Guest rate limit exceeded (5 tasks/min)")
-
-        # Audit log
-        log = AuditLog(
-            user_id=user["id"] if user else None,
-            action=f"{method} {path}",
-            timestamp=datetime.utcnow(),
-        )
-        db.add(log)
-        db.commit()
+            db.add(log)
+            await db.commit()
+            metrics.AUDIT_WRITE_LATENCY.observe(time.perf_counter() - audit_start)
 
         return await call_next(request)
@@ -0,0 +1,135 @@
+"""
+summaries.py — Hierarchical Repository Summaries
+================================================
+
+Bottom-up, per-directory summaries of a repository for the `structure` preset.
+
+Responsibilities:
+- Group a commit's recursive tree into directories (each with its git tree SHA).
+- Summarize each directory from its files + its children's summaries.
+- Cache every summary under the directory's tree SHA, so after a commit only
+  directories whose tree SHA changed (the changed path up to the root) are
+  re-summarized; everything else is reused.
+- Assemble the cached summaries into a compact repo overview for the prompt.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from server.cache import LRUCache
+from server.config import settings
+from server.debug import debug_log
+from server.hf_client import summarize_directory
+from server.tracing import span
+
+MAX_LISTED_FILES = 40  # files named per directory in the summarization prompt
+
+# tree SHA → summary text (tree SHAs are content-addressed, so entries never go stale)
+_summaries = LRUCache(maxsize=4096, name="directory_summary")
+
+
+@dataclass
+class Directory:
+    path: str
+    sha: str
+    files: List[tuple] = field(default_factory=list)  # (name, size)
+    children: List[str] = field(default_factory=list)
+
+    @property
+    def depth(self) -> int:
+        return 0 if not self.path else self.path.count("/") + 1
+
+
+@dataclass
+class RepoSummary:
+    sha: str
+    text: str
+    computed: int  # directories summarized by this call
+    reused: int  # directories served from cache
+
+
+def build_directories(root_sha: str, entries: List[dict]) -> Dict[str, Directory]:
+    """Group recursive tree entries by directory path ('' is the repo root)."""
+    dirs = {"": Directory(path="", sha=root_sha)}
+    for entry in entries:
+        if entry["type"] == "tree":
+            dirs.setdefault(entry["path"], Directory(path=entry["path"], sha=entry["sha"])).sha = entry["sha"]
+
+    for entry in entries:
+        parent = os.path.dirname(entry["path"])
+        if parent not in dirs:
+            continue  # parent outside a truncated tree listing
+        if entry["type"] == "tree":
+            dirs[parent].children.append(entry["path"])
+        elif entry["type"] == "blob":
+            dirs[parent].files.append((os.path.basename(entry["path"]), entry.get("size", 0)))
+    return dirs
+
+
+def _describe(directory: Directory, dirs: Dict[str, Directory]) -> str:
+    """Prompt input for one directory: its files plus each child's cached summary."""
+    lines = [f"Directory: /{directory.path}"]
+
+    files = sorted(directory.files)
+    if files:
+        listed = ", ".join(f"{name} ({size} B)" for name, size in files[:MAX_LISTED_FILES])
+        extra = len(files) - MAX_LISTED_FILES
+        lines.append(f"Files: {listed}" + (f", … and {extra} more" if extra > 0 else ""))
+
+    for child_path in sorted(directory.children):
+        child = dirs[child_path]
+        summary = _summaries.get(child.sha)
+        if summary is None:  # beyond max depth: describe by contents only
+            summary = f"{len(child.files)} files, {len(child.children)} subdirectories"
+        lines.append(f"Subdirectory {os.path.basename(child_path)}/: {summary}")
+    return "\n".join(lines)
+
+
+def _assemble(dirs: Dict[str, Directory]) -> str:
+    """Indented overview: root summary followed by each summarized directory."""
+    lines = [f"Repository overview: {_summaries.get(dirs[''].sha, '')}"]
+    for path in sorted(p for p in dirs if p):
+        summary = _summaries.get(dirs[path].sha)
+        if summary:
+            lines.append(f"{'  ' * (dirs[path].depth - 1)}- {path}/: {summary}")
+    return "\n".join(lines)
+
+
+async def summarize_repo(
+    github_service,
+    owner: str,
+    repo: str,
+    sha: str,
+    on_progress: Optional[Callable[[str], None]] = None,
+) -> RepoSummary:
+    """Summarize a commit bottom-up, re-running completions only for changed directories."""
+    with span("github.tree"):
+        tree = await asyncio.to_thread(github_service.get_tree, owner, repo, sha, True)
+    dirs = build_directories(tree["sha"], tree.get("tree", []))
+
+    targets = [d for d in dirs.values() if d.depth <= settings.summary_max_depth]
+    pending = [d for d in targets if d.sha not in _summaries]
+    semaphore = asyncio.Semaphore(settings.summary_concurrency)
+
+    async def _summarize(directory: Directory):
+        async with semaphore:
+            with span("summary.directory", path=f"/{directory.path}"):
+                text = await asyncio.to_thread(
+                    summarize_directory, _describe(directory, dirs), settings.summary_max_tokens
+                )
+        _summaries.set(directory.sha, text)
+
+    # Deepest first: every child is cached before its parent is described
+    for depth in sorted({d.depth for d in pending}, reverse=True):
+        level = [d for d in pending if d.depth == depth]
+        if on_progress:
+            on_progress(f"Summarizing {len(level)} director{'y' if len(level) == 1 else 'ies'} at depth {depth}")
+        await asyncio.gather(*(_summarize(d) for d in level))
+
+    result = RepoSummary(sha=sha, text=_assemble(dirs), computed=len(pending), reused=len(targets) - len(pending))
+    debug_log("Repo summary assembled", context={
+        "repo": f"{owner}/{repo}", "sha": sha, "computed": result.computed, "reused": result.reused,
+    })
+    return result
@@ -0,0 +1,135 @@
+"""
+task_store.py — Durable Task Checkpoints
+========================================
+
+Persists DevBot tasks and their logs (`tasks` / `logs` tables) so they
+survive restarts and rolling deploys. The live state stays in memory
+(`tasks.TASKS` / `tasks.LOGS`); this module only writes checkpoints.
+
+Responsibilities:
+- Allocate task ids from the database, so ids stay unique across restarts
+  and instances.
+- Checkpoint a task's status, output and any logs not yet written
+  (when it starts running, on finish, and for unfinished tasks when the
+  server drains).
+- Load a checkpointed task back into the in-memory shape.
+- Every checkpoint is a heartbeat; mark pending / running tasks whose
+  heartbeat went stale (their instance died without draining)
+  as interrupted.
+- Claim interrupted tasks atomically, so exactly one instance resumes each.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+
+from server.database import AsyncSessionLocal
+from server.models import Log, Task
+
+INTERRUPTED = "interrupted"
+UNFINISHED = ("pending", "running")
+
+_saved_logs: dict[int, int] = {}  # task id → log entries already written (absent once final)
+_save_locks: dict[int, asyncio.Lock] = {}  # periodic and final checkpoints of a task never interleave
+
+
+async def create(preset: str, context: str, user_id: Optional[int]) -> dict:
+    """Insert a pending task row; returns {id, created_at}."""
+    async with AsyncSessionLocal() as db:
+        row = Task(type=preset, status="pending", context=context, user_id=user_id)
+        db.add(row)
+        await db.commit()
+    _saved_logs[row.id] = 0
+    return {"id": row.id, "created_at": row.created_at.isoformat()}
+
+
+async def save(task: dict, logs: list[dict], final: bool = False):
+    """Write status + output + heartbeat and append the log entries not yet persisted (one transaction).
+
+    No-op once the final checkpoint is written, so a late periodic checkpoint
+    cannot overwrite a finished status.
+    """
+    task_id = task["id"]
+    async with _save_locks.setdefault(task_id, asyncio.Lock()):
+        if task_id not in _saved_logs:
+            return
+        saved = _saved_logs[task_id]
+        new_logs = logs[saved:]  # snapshot: log_event may append while we await
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Task).where(Task.id == task_id)
+                .values(status=task["status"], output=task.get("output"), heartbeat_at=datetime.utcnow())
+            )
+            if new_logs:
+                await db.execute(insert(Log), [
+                    {"task_id": task_id, "timestamp": datetime.fromisoformat(entry["timestamp"]),
+                     "message": entry["event"]}
+                    for entry in new_logs
+                ])
+            await db.commit()
+        if final:
+            _saved_logs.pop(task_id, None)
+            _save_locks.pop(task_id, None)
+        else:
+            _saved_logs[task_id] = saved + len(new_logs)
+
+
+async def load(task_id: int) -> Optional[tuple[dict, list[dict]]]:
+    """(task, logs) in the in-memory shape, or None if the task was never stored."""
+    async with AsyncSessionLocal() as db:
+        row = await db.get(Task, task_id)
+        if row is None:
+            return None
+        entries = (await db.execute(
+            select(Log.timestamp, Log.message).where(Log.task_id == task_id).order_by(Log.id)
+        )).all()
+
+    task = {
+        "id": row.id,
+        "type": row.type,
+        "status": row.status,
+        "created_at": row.created_at.isoformat(),
+        "context": row.context or "",
+        "output": row.output,
+        "user_id": row.user_id,
+        "timings": None,
+        "version": 0,
+    }
+    logs = [{"event": message, "timestamp": timestamp.isoformat()} for timestamp, message in entries]
+    _saved_logs[task_id] = len(logs)
+    return task, logs
+
+
+async def interrupt_stale(stale_after: float, exclude: list[int]) -> int:
+    """Mark pending / running tasks without a heartbeat for `stale_after` seconds as interrupted."""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Task)
+            .where(Task.status.in_(UNFINISHED), Task.id.not_in(exclude),
+                   (Task.heartbeat_at < cutoff) | Task.heartbeat_at.is_(None))
+            .values(status=INTERRUPTED)
+        )
+        await db.commit()
+    return result.rowcount
+
+
+async def claim(task_id: int) -> bool:
+    """Atomically move an interrupted task back to pending; True for the one caller that wins."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Task).where(Task.id == task_id, Task.status == INTERRUPTED)
+            .values(status="pending", heartbeat_at=datetime.utcnow())  # fresh: not re-staled before it runs
+        )
+        await db.commit()
+    return result.rowcount == 1
+
+
+async def interrupted_ids(limit: int) -> list[int]:
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(
+            select(Task.id).where(Task.status == INTERRUPTED).order_by(Task.id).limit(limit)
+        )
+        return list(rows)
@@ -8,20 +8,48 @@ Responsibilities:
 - Define API routes for running and monitoring tasks (`/tasks`).
 - Handle task lifecycle (pending → running → completed/failed).
 - Manage in-memory task state and logs.
-- Stream logs/results back to the frontend via Server-Sent Events (SSE).
+- Serve cheap polling: `?since=<cursor>` log deltas, ETag / `304 Not Modified`
+  from a per-task version, immutable caching once a task has finished.
+- Stream logs/results back to the frontend via Server-Sent Events (SSE);
+  each log entry is encoded (orjson) once and the frame shared by all subscribers.
 - Integrate with external services (GitHubService + Hugging Face client).
+- Checkpoint tasks + logs to the database (`task_store`) on start and finish; on
+  shutdown, stop accepting tasks, drain running ones up to `TASK_DRAIN_TIMEOUT`,
+  then interrupt + checkpoint the rest and resume them after the restart.
+- Checkpoint running tasks periodically (heartbeat + new logs); tasks of an
+  instance that died without draining go stale and are interrupted + resumed
+  by a live instance.
+- End every SSE stream with a terminal `event: end` frame carrying the status.
 
 """
 
 import asyncio
 import json
+import secrets
+import signal
+import threading
+import time
 import traceback
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
-
-from server.hf_client import run_completion
-from server.github_service import GitHubService
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from sqlalchemy import select
+from typing_extensions import TypedDict
+
+from server import metrics, task_store, tracing
+from server.config import settings
+from server.hf_client import SYSTEM_PRESETS, run_completion
+from server.github_service import get_github_service
+from server.database import AsyncSessionLocal
+from server.jwt_utils import decode_access_token, oauth2_scheme
+from server.memory import conversation_memory
+from server.outline import format_outline, get_file_outline
+from server.retrieval import retrieve_context
+from server.summaries import summarize_repo
+from server.models import User
 from server.debug import debug_log
 
 # ----------------------------------------------------
@@ -29,147 +57,549 @@ from server.debug import debug_log
 # ----------------------------------------------------
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# ----------------------------------------------------
+# Response Shapes
+# ----------------------------------------------------
+class LogEntry(TypedDict):
+    event: str
+    timestamp: str
+
+
+class TaskDetail(TypedDict):
+    id: int
+    type: str
+    status: str
+    created_at: str
+    context: str
+    output: Optional[str]
+    timings: Optional[dict]
+    version: int
+    logs: list[LogEntry]  # entries from `since` onwards
+    cursor: int  # pass as `since` on the next poll
+
 # ----------------------------------------------------
 # In-Memory Task Stores (demo implementation)
 # ----------------------------------------------------
 TASKS: dict[int, dict] = {}
 LOGS: dict[int, list] = {}
-task_queues: dict[int, asyncio.Queue] = {}
+LOG_FRAMES: dict[int, list[bytes]] = {}  # LOGS entries pre-encoded as SSE frames
+task_subscribers: dict[int, set[asyncio.Queue]] = {}  # one queue per open SSE stream
+TRACES: dict[int, tracing.Trace] = {}  # live traces of running tasks
+RUNNING: dict[int, asyncio.Task] = {}  # tasks executing in this process (ids come from task_store)
 
-NEXT_TASK_ID = 1  # Simple auto-increment counter
-github_service = GitHubService()
+FINISHED = ("completed", "failed")
+PRIVATE_FIELDS = ("user_id",)  # server-side task state, never sent to pollers
+INTERRUPTED = task_store.INTERRUPTED  # cut off by a shutdown; resumed by the next instance
+INSTANCE = secrets.token_hex(4)  # in ETags: versions restart when another process loads a task
+CHECKPOINT_TIMEOUT = 5  # seconds interrupted tasks get to write their checkpoint
+
+_drain: asyncio.Task | None = None
 
 # ----------------------------------------------------
 # Helpers
 # ----------------------------------------------------
+CONNECTED_FRAME = b'data: {"event": "connected"}\n\n'
+
+
+def sse_frame(payload) -> bytes:
+    """Encode one SSE `data:` frame (serialized once, then shared by every subscriber)."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def end_frame(task: dict) -> bytes:
+    """Terminal `end` event (named, so `onmessage` log handlers never see it)."""
+    return b"event: end\n" + sse_frame({"task_id": task["id"], "status": task["status"]})
+
+
 async def stream_logs(log_queue: asyncio.Queue):
-    """Yield log messages via SSE (with initial heartbeat)."""
-    yield 'data: {"event": "connected"}\n\n'
+    """Yield pre-encoded SSE frames (with initial heartbeat)."""
+    yield CONNECTED_FRAME
     while True:
-        message = await log_queue.get()
-        if message is None:
+        frame = await log_queue.get()
+        if frame is None:
             break
-        yield f"data: {json.dumps(message)}\n\n"
+        yield frame
+
+
+def subscribe(task_id: int) -> tuple[list[bytes], asyncio.Queue]:
+    """Register an SSE subscriber: (frames so far, queue receiving every later frame).
+
+    Snapshot + registration happen without yielding to the event loop, so no
+    entry is missed or delivered twice. A task not running in this process
+    (finished, interrupted or loaded from a checkpoint) gets a closed queue.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    backlog = list(LOG_FRAMES.get(task_id, []))
+    if task_id not in RUNNING:
+        queue.put_nowait(end_frame(TASKS[task_id]))
+        queue.put_nowait(None)
+    else:
+        task_subscribers.setdefault(task_id, set()).add(queue)
+    return backlog, queue
+
 
+def unsubscribe(task_id: int, queue: asyncio.Queue):
+    subscribers = task_subscribers.get(task_id)
+    if subscribers is not None:
+        subscribers.discard(queue)
 
-def log_event(task_id: int, event: str, log_queue: asyncio.Queue | None = None):
-    """Append log entry to memory + push to SSE queues."""
+
+def preset_label(preset: str) -> str:
+    """Metric label for a preset (unknown values collapse to keep cardinality bounded)."""
+    return preset if preset in SYSTEM_PRESETS else "unknown"
+
+
+def collect_metrics():
+    """Scrape-time task store metrics (queue depth, tracked tasks)."""
+    return [
+        ("task_queue_depth", "gauge", "SSE log entries waiting in subscriber queues.",
+         [("task_queue_depth", {}, sum(q.qsize() for qs in task_subscribers.values() for q in qs))]),
+        ("tasks_tracked", "gauge", "Tasks held in the in-memory store.",
+         [("tasks_tracked", {}, len(TASKS))]),
+    ]
+
+
+def touch(task_id: int):
+    """Bump the task version (drives ETags: any visible change must call this)."""
+    TASKS[task_id]["version"] += 1
+
+
+def task_etag(task: dict) -> str:
+    return f'"task-{task["id"]}-{INSTANCE}-v{task["version"]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def log_event(task_id: int, event: str):
+    """Append log entry to memory + fan out its SSE frame to every subscriber."""
     entry = {"event": event, "timestamp": datetime.utcnow().isoformat()}
+    frame = sse_frame(entry)
     LOGS[task_id].append(entry)
+    LOG_FRAMES[task_id].append(frame)
+    touch(task_id)
 
-    # Push to specific queue (if provided)
-    if log_queue:
-        asyncio.create_task(log_queue.put(entry))
-    # Push to global task queue
-    if task_id in task_queues:
-        asyncio.create_task(task_queues[task_id].put(entry))
+    for queue in task_subscribers.get(task_id, ()):
+        queue.put_nowait(frame)
 
     debug_log(f"Task {task_id} - {event}")
 
 
-async def run_hf_task(task_id: int, preset: str, context: str, log_queue: asyncio.Queue):
+def close_streams(task_id: int):
+    """Send the terminal `end` event, then end-of-stream, to every subscriber of a finished task."""
+    frame = end_frame(TASKS[task_id])
+    for queue in task_subscribers.pop(task_id, ()):
+        queue.put_nowait(frame)
+        queue.put_nowait(None)
+
+
+def remember(task: dict, logs: list[dict]):
+    """Put a task (new or loaded from a checkpoint) into the in-memory stores."""
+    TASKS[task["id"]] = task
+    LOGS[task["id"]] = logs
+    LOG_FRAMES[task["id"]] = [sse_frame(entry) for entry in logs]
+
+
+async def checkpoint(task_id: int, final: bool = False):
+    """Write the task's status, output and new logs to the database (errors are logged, not raised)."""
+    try:
+        await task_store.save(TASKS[task_id], LOGS[task_id], final=final)
+    except Exception as e:
+        debug_log("Task checkpoint failed", e, context={"task_id": task_id})
+
+
+def query_text(context: str) -> str:
+    """Flatten a task context (JSON or plain text) into a retrieval query."""
+    try:
+        data = json.loads(context)
+    except (TypeError, ValueError):
+        return context or ""
+
+    values = []
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+        elif item is not None:
+            values.append(str(item))
+    return " ".join(values)
+
+
+async def resolve_user_id(token: str | None) -> int | None:
+    """Map an optional bearer token to a user id (None for guests / invalid tokens)."""
+    if not token:
+        return None
+    payload = decode_access_token(token)
+    if not payload or not payload.get("sub"):
+        return None
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(User.id).where(User.email == payload["sub"]))
+
+
+async def can_view(task: dict, token: str | None) -> bool:
+    """Guest tasks are readable by id; a user's task only by that user or an admin."""
+    if task.get("user_id") is None:
+        return True
+    payload = decode_access_token(token) if token else None
+    if not payload or not payload.get("sub"):
+        return False
+    async with AsyncSessionLocal() as db:
+        viewer = (await db.execute(select(User.id, User.role).where(User.email == payload["sub"]))).first()
+    return viewer is not None and (viewer.id == task["user_id"] or viewer.role == "admin")
+
+
+async def record_memory(user_id: int, context: str, response_text: str):
+    """Persist a completed turn (runs in the background so SSE can close promptly)."""
+    try:
+        await conversation_memory.record(user_id, context, response_text)
+    except Exception as e:
+        debug_log("Conversation memory update failed", e, context={"user_id": user_id})
+
+
+async def run_hf_task(
+    task_id: int,
+    preset: str,
+    context: str,
+    user_id: int | None = None,
+):
     """Run a task with Hugging Face + optional GitHub context."""
+    started = time.perf_counter()
+    github_service = get_github_service()
+    metrics.TASKS_ACTIVE.inc()
+    TRACES[task_id] = tracing.start_trace(task_id)
     try:
         TASKS[task_id]["status"] = "running"
+        touch(task_id)
+        await checkpoint(task_id)  # durable "running": heartbeats now keep it from going stale
         repo_context = ""
+        with tracing.span("memory.load"):
+            memory = await conversation_memory.load(user_id) if user_id else []
 
         # Preset routing
         if preset == "structure":
-            log_event(task_id, "📂 Fetching repo tree...", log_queue)
-            tree = github_service.get_repo_tree("AlexSeisler", "AI-Dev-Federation-Dashboard")
-            repo_context = f"Repo Tree:\n{json.dumps(tree, indent=2)}"
+            log_event(task_id, "📂 Summarizing repo structure...")
+            try:
+                with tracing.span("github.resolve_sha"):
+                    _, sha = await asyncio.to_thread(
+                        github_service.resolve_sha, "AlexSeisler", "AI-Dev-Federation-Dashboard"
+                    )
+                with tracing.span("context.structure_summary"):
+                    summary = await summarize_repo(
+                        github_service, "AlexSeisler", "AI-Dev-Federation-Dashboard", sha,
+                        on_progress=lambda msg: log_event(task_id, f"🗂️ {msg}"),
+                    )
+                log_event(
+                    task_id,
+                    f"🗂️ Structure ready ({summary.computed} directories summarized, {summary.reused} cached)"
+                )
+                repo_context = summary.text
+            except Exception as e:
+                debug_log("Structure summary failed, falling back to full tree", e)
+                with tracing.span("context.repo_tree"):
+                    tree = await asyncio.to_thread(
+                        github_service.get_repo_tree, "AlexSeisler", "AI-Dev-Federation-Dashboard"
+                    )
+                repo_context = f"Repo Tree:\n{json.dumps(tree, indent=2)}"
         elif preset == "file":
-            log_event(task_id, "📂 Fetching file src/App.tsx...", log_queue)
-            code = github_service.get_file("AlexSeisler", "AI-Dev-Federation-Dashboard", "src/App.tsx")
-            repo_context = f"File: src/App.tsx\n\n{code[:5000]}..."
+            log_event(task_id, "🔎 Retrieving relevant code...")
+            try:
+                with tracing.span("context.retrieval"):
+                    repo_context = await asyncio.to_thread(
+                        retrieve_context, github_service,
+                        "AlexSeisler", "AI-Dev-Federation-Dashboard", query_text(context),
+                    )
+            except Exception as e:
+                debug_log("Retrieval failed, falling back to src/App.tsx", e)
+
+            if not repo_context:
+                log_event(task_id, "📂 Outlining file src/App.tsx...")
+                try:
+                    with tracing.span("context.outline"):
+                        outline = await asyncio.to_thread(
+                            get_file_outline, github_service,
+                            "AlexSeisler", "AI-Dev-Federation-Dashboard", "src/App.tsx",
+                        )
+                    repo_context = format_outline(outline)
+                except Exception as e:
+                    debug_log("Outline failed, falling back to raw src/App.tsx", e)
+                    with tracing.span("context.file"):
+                        code = await asyncio.to_thread(
+                            github_service.get_file, "AlexSeisler", "AI-Dev-Federation-Dashboard", "src/App.tsx"
+                        )
+                    repo_context = f"File: src/App.tsx\n\n{code[:5000]}..."
         elif preset == "brainstorm":
-            log_event(task_id, "📊 Starting brainstorm (no repo context)...", log_queue)
+            log_event(task_id, "📊 Starting brainstorm (no repo context)...")
         else:
-            log_event(task_id, f"⚠️ Unknown preset: {preset}", log_queue)
+            log_event(task_id, f"⚠️ Unknown preset: {preset}")
 
         # Hugging Face call
-        log_event(task_id, "📡 Sending request to Hugging Face...", log_queue)
-        response_text = run_completion(preset, context or "", [], repo_context)
+        log_event(task_id, "📡 Sending request to Hugging Face...")
+        response_text = await asyncio.to_thread(run_completion, preset, context or "", memory, repo_context)
 
         # Preview in logs (truncated for readability)
         preview = response_text[:200] + ("..." if len(response_text) > 200 else "")
-        log_event(task_id, f"✅ HF Response: {preview}", log_queue)
+        log_event(task_id, f"✅ HF Response: {preview}")
 
         # Store result
         TASKS[task_id]["status"] = "completed"
         TASKS[task_id]["output"] = response_text
 
+        if user_id:
+            asyncio.create_task(record_memory(user_id, context or "", response_text))
+
+    except asyncio.CancelledError:
+        # Cancelled by drain(): checkpoint below and let the next instance resume it
+        # (not re-raised, so the checkpoint write in `finally` can still await)
+        log_event(task_id, "⏸️ Interrupted by server shutdown; "
+                           + ("it will resume after the restart" if settings.task_resume else "please re-run it"))
+        TASKS[task_id]["status"] = INTERRUPTED
+
     except Exception as e:
         error_detail = f"Task failed: {type(e).__name__} - {e}"
         traceback.print_exc()
-        log_event(task_id, f"❌ {error_detail}", log_queue)
+        log_event(task_id, f"❌ {error_detail}")
         TASKS[task_id]["status"] = "failed"
         TASKS[task_id]["output"] = error_detail
 
     finally:
-        await log_queue.put(None)
-        if task_id in task_queues:
-            await task_queues[task_id].put(None)
+        metrics.TASKS_ACTIVE.dec()
+        TASKS[task_id]["timings"] = tracing.finish_trace(TRACES.pop(task_id))
+        touch(task_id)
+        metrics.TASK_DURATION.observe(time.perf_counter() - started, preset=preset_label(preset))
+        metrics.TASKS_FINISHED.inc(preset=preset_label(preset), status=TASKS[task_id]["status"])
+        # Durable before subscribers are told: a client that re-fetches elsewhere finds the result
+        await checkpoint(task_id, final=TASKS[task_id]["status"] in FINISHED)
+        RUNNING.pop(task_id, None)
+        close_streams(task_id)
         debug_log("Task finished", context={"task_id": task_id})
 
+# ----------------------------------------------------
+# Drain + Resume (rolling deploys)
+# ----------------------------------------------------
+def draining() -> bool:
+    return _drain is not None
+
+
+def start(task: dict):
+    """Run a task (already in TASKS) in the background of this process."""
+    RUNNING[task["id"]] = asyncio.create_task(
+        run_hf_task(task["id"], task["type"], task["context"], task["user_id"])
+    )
+
+
+async def drain(timeout: float):
+    """Let running tasks finish for up to `timeout` seconds, then interrupt + checkpoint the rest."""
+    if not RUNNING:
+        return
+    debug_log("Draining tasks", context={"running": len(RUNNING), "timeout_s": timeout})
+    deadline = time.monotonic() + timeout
+    # Re-read RUNNING each round: a request already past the draining() check may still start one
+    while RUNNING and time.monotonic() < deadline:
+        await asyncio.wait(list(RUNNING.values()), timeout=deadline - time.monotonic())
+    pending = list(RUNNING.values())
+    if pending:
+        for task in pending:
+            task.cancel()
+        await asyncio.wait(pending, timeout=CHECKPOINT_TIMEOUT)
+        debug_log("Interrupted tasks at drain deadline", context={"interrupted": len(pending)})
+
+
+def begin_drain() -> asyncio.Task:
+    """Stop accepting tasks and start draining (idempotent; returns the drain to await)."""
+    global _drain
+    if _drain is None:
+        _drain = asyncio.create_task(drain(settings.task_drain_timeout))
+    return _drain
+
+
+def drain_on_signal():
+    """Begin draining as soon as SIGTERM arrives.
+
+    Uvicorn waits for open connections (SSE streams of running tasks) before
+    the shutdown event fires; draining on the signal lets those streams end.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return  # signal handlers can only be installed from the main thread
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_sigterm(sig, frame):
+        loop.call_soon_threadsafe(begin_drain)
+        if callable(previous):
+            previous(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+async def resume(task: dict, logs: list[dict]) -> bool:
+    """Claim an interrupted task and run it again here; False if another instance got it."""
+    if draining() or not await task_store.claim(task["id"]):
+        return False
+    task["status"] = "pending"
+    remember(task, logs)
+    touch(task["id"])
+    log_event(task["id"], "🔁 Resumed after a server restart")
+    start(task)
+    return True
+
+
+async def resume_interrupted():
+    """Resume tasks checkpointed as interrupted (drained, or their instance died)."""
+    try:
+        for task_id in await task_store.interrupted_ids(settings.task_resume_batch):
+            loaded = await task_store.load(task_id)
+            if loaded and await resume(*loaded):
+                debug_log("Resumed interrupted task", context={"task_id": task_id})
+    except Exception as e:
+        debug_log("Resuming interrupted tasks failed", e)
+
+
+async def recovery_loop():
+    """Background task: checkpoint this process's tasks, interrupt stale ones, resume interrupted ones."""
+    while True:
+        for task_id in list(RUNNING):
+            await checkpoint(task_id)  # heartbeat + logs so far
+        try:
+            stale = await task_store.interrupt_stale(settings.task_stale_after, exclude=list(RUNNING))
+            if stale:
+                debug_log("Interrupted tasks of a dead instance", context={"tasks": stale})
+        except Exception as e:
+            debug_log("Stale task check failed", e)
+        if settings.task_resume:
+            await resume_interrupted()
+        await asyncio.sleep(settings.task_heartbeat_interval)
+
+
+async def find_task(task_id: int, token: str | None) -> tuple[dict, list[dict]] | None:
+    """(task, logs) from memory, else from its checkpoint (resumed here if it was interrupted).
+
+    None when the task does not exist or `token` may not see it (callers answer
+    404 either way, so ids of other users' tasks cannot be probed). Only tasks
+    that cannot change under another instance are kept in memory; a task still
+    running elsewhere is returned as a snapshot.
+    """
+    if task_id in TASKS:
+        return (TASKS[task_id], LOGS[task_id]) if await can_view(TASKS[task_id], token) else None
+    loaded = await task_store.load(task_id)
+    if loaded is None or not await can_view(loaded[0], token):
+        return None
+    task, logs = loaded
+    if task["status"] == INTERRUPTED and settings.task_resume and await resume(task, logs):
+        return task, LOGS[task_id]
+    if task["status"] in FINISHED or task["status"] == INTERRUPTED:
+        remember(task, logs)
+    return task, logs
+
 # ----------------------------------------------------
 # API Routes
 # ----------------------------------------------------
 @router.post("/run/{preset}")
-async def run_task(preset: str, context: dict | str | None = None):
-    """Start a new runner task (demo in-memory)."""
-    global NEXT_TASK_ID
-    task_id = NEXT_TASK_ID
-    NEXT_TASK_ID += 1
+async def run_task(
+    preset: str,
+    context: dict | str | None = None,
+    token: str | None = Depends(oauth2_scheme),
+):
+    """Start a new runner task (checkpointed to the DB). Authenticated users get conversation memory."""
+    if draining():
+        raise HTTPException(status_code=503, detail="Server is restarting, retry shortly", headers={"Retry-After": "5"})
+    user_id = await resolve_user_id(token)
+    context_text = context if isinstance(context, str) else json.dumps(context or {})
+    try:
+        row = await task_store.create(preset, context_text, user_id)
+    except Exception as e:
+        debug_log("Task store unavailable", e)
+        raise HTTPException(status_code=503, detail="Task store unavailable")
 
-    TASKS[task_id] = {
+    task_id = row["id"]
+    remember({
         "id": task_id,
         "type": preset,
         "status": "pending",
-        "created_at": datetime.utcnow().isoformat(),
-        "context": context if isinstance(context, str) else json.dumps(context or {}),
+        "created_at": row["created_at"],
+        "context": context_text,
         "output": None,
-    }
-    LOGS[task_id] = []
+        "user_id": user_id,
+        "timings": None,
+        "version": 0,
+    }, [])
 
-    log_queue = asyncio.Queue()
-    task_queues[task_id] = log_queue
-
-    asyncio.create_task(run_hf_task(task_id, preset, TASKS[task_id]["context"], log_queue))
+    metrics.TASKS_STARTED.inc(preset=preset_label(preset))
+    start(TASKS[task_id])
 
     return {"task_id": task_id, "status": "started"}
 
 
-@router.get("/{task_id}")
-async def get_task(task_id: int):
-    """Return task details with logs + full output."""
-    task = TASKS.get(task_id)
-    if not task:
+@router.get("/{task_id}", response_model=TaskDetail)
+async def get_task(
+    task_id: int,
+    request: Request,
+    since: int = Query(0, ge=0),
+    token: str | None = Depends(oauth2_scheme),
+):
+    """Return task details with logs + full output (a user's task: owner or admin token required).
+
+    `since` is the `cursor` from a previous poll: only log entries after it
+    are returned. Unchanged tasks answer `304` to `If-None-Match`; finished
+    tasks never change again, so they are cacheable as immutable.
+    """
+    found = await find_task(task_id, token)
+    if not found:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {
-        **task,
-        "logs": LOGS.get(task_id, []),
-        "output": task.get("output", ""),
+    task, logs = found
+
+    etag = task_etag(task)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable" if task["status"] in FINISHED
+        else "private, no-cache",  # running: always revalidate (cheap 304 when unchanged)
     }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    trace = TRACES.get(task_id)
+    # Returned as a Response: skips jsonable_encoder + response_model validation
+    return ORJSONResponse({
+        **{key: value for key, value in task.items() if key not in PRIVATE_FIELDS},
+        "logs": logs[since:],
+        "cursor": len(logs),
+        "output": task.get("output", ""),
+        "timings": trace.summary() if trace else task.get("timings"),
+    }, headers=headers)
 
 
 @router.get("/{task_id}/stream")
-async def stream_task(task_id: int, request: Request):
-    """Stream logs for a running task (Server-Sent Events)."""
-    if task_id not in TASKS:
+async def stream_task(task_id: int, request: Request, token: str | None = Depends(oauth2_scheme)):
+    """Stream logs for a running task (Server-Sent Events; same access rule as GET /tasks/{id})."""
+    found = await find_task(task_id, token)
+    if not found:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    if task_id not in task_queues:
-        task_queues[task_id] = asyncio.Queue()
-
-    log_queue = task_queues[task_id]
+    if task_id in TASKS:
+        backlog, log_queue = subscribe(task_id)
+    else:  # snapshot of a task running on another instance: replay it and end
+        task, logs = found
+        backlog, log_queue = [sse_frame(entry) for entry in logs], asyncio.Queue()
+        log_queue.put_nowait(end_frame(task))
+        log_queue.put_nowait(None)
 
     async def event_generator():
-        # Replay existing logs
-        for log in LOGS.get(task_id, []):
-            yield f"data: {json.dumps(log)}\n\n"
-        # Stream new logs
-        async for message in stream_logs(log_queue):
-            yield message
+        metrics.SSE_SUBSCRIBERS.inc()
+        try:
+            # Replay existing logs
+            for frame in backlog:
+                yield frame
+            # Stream new logs
+            async for message in stream_logs(log_queue):
+                yield message
+        finally:
+            unsubscribe(task_id, log_queue)
+            metrics.SSE_SUBSCRIBERS.dec()
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
@@ -0,0 +1,115 @@
+"""
+tracing.py — Per-Task Phase Timing
+==================================
+
+Lightweight span instrumentation for DevBot tasks, so a slow task can be broken
+down into GitHub fetches, retrieval, prompt building, HF attempts and backoff.
+
+Responsibilities:
+- Start a trace per task and record nested spans via a `span()` context manager.
+- Propagate the active trace through `asyncio` tasks and `asyncio.to_thread`
+  (context variables), so service code needs no extra arguments.
+- Summarize spans for `GET /tasks/{task_id}` (per-phase totals + span list).
+- Optionally append finished traces as JSON lines to `TRACE_EXPORT_PATH`.
+
+Spans are no-ops outside a trace (e.g. plain `/repo/*` requests).
+"""
+
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from server.config import settings
+from server.debug import debug_log
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    """Spans recorded for one task (thread-safe: spans may close in worker threads)."""
+
+    def __init__(self, trace_id: Any):
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _offset_ms(self, at: float) -> float:
+        return round((at - self.started) * 1000, 2)
+
+    def record(self, span: Dict[str, Any]):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> Dict[str, Any]:
+        """Total, per-phase totals (by span name) and the individual spans, in start order."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        phases: Dict[str, float] = {}
+        for s in spans:
+            phases[s["name"]] = round(phases.get(s["name"], 0.0) + s["duration_ms"], 2)
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {"total_ms": self._offset_ms(end), "phases": phases, "spans": spans}
+
+
+def start_trace(trace_id: Any) -> Trace:
+    """Make a new trace current for this context (and everything it spawns)."""
+    trace = Trace(trace_id)
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def finish_trace(trace: Trace) -> Dict[str, Any]:
+    """Close a trace, export it if configured, and return its summary."""
+    trace.finished = time.perf_counter()
+    summary = trace.summary()
+    if settings.trace_export_path:
+        try:
+            line = json.dumps({"trace_id": trace.trace_id, **summary})
+            with _export_lock, open(settings.trace_export_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            debug_log("Trace export failed", e, context={"path": settings.trace_export_path})
+    return summary
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a span of the current trace; yields a dict for extra attributes."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield attrs
+        return
+
+    span_id = next(trace._ids)
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        record = {
+            "id": span_id,
+            "parent": parent,
+            "name": name,
+            "start_ms": trace._offset_ms(start),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            **attrs,
+        }
+        if error:
+            record["error"] = error
+        trace.record(record)
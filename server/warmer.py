@@ -0,0 +1,137 @@
+"""
+warmer.py — GitHub Cache Warming
+================================
+
+Keeps the GitHub data that preset tasks need hot, so tasks against the
+default DevBot repo never wait on GitHub in steady state.
+
+Responsibilities:
+- Parse warm targets from `CACHE_WARM_TARGETS`
+  (`owner/repo[@branch][:path,path]`, `;`-separated).
+- At startup and every `CACHE_WARM_INTERVAL` seconds, re-resolve each
+  target's branch SHA; when it moved, preload the tree, hot files and
+  (optionally) the retrieval index for the new SHA.
+- Pin the ref only once its caches are warm, so tasks switch to a new SHA
+  without paying cold round trips.
+- Apply GitHub push webhooks (`apply_push`): warm the pushed SHA and re-pin
+  immediately instead of waiting for the next interval check.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+from server import metrics
+from server.config import settings
+from server.debug import debug_log
+from server.github_service import get_github_service, invalidate_ref, pin_ref, pinned_ref, repin_branch
+from server.retrieval import get_index
+
+
+@dataclass(frozen=True)
+class WarmTarget:
+    owner: str
+    repo: str
+    branch: Optional[str] = None  # None = default branch
+    paths: tuple = ()
+
+
+def parse_targets(spec: str) -> List[WarmTarget]:
+    """`"owner/repo@branch:a.py,b.py; other/repo"` → WarmTargets (malformed entries are skipped)."""
+    targets = []
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        ref, _, paths = item.partition(":")
+        repo_id, _, branch = ref.partition("@")
+        owner, _, repo = repo_id.strip().partition("/")
+        if not owner or not repo:
+            debug_log("Ignoring malformed cache warm target", context={"target": item})
+            continue
+        targets.append(WarmTarget(
+            owner, repo, branch.strip() or None,
+            tuple(p.strip() for p in paths.split(",") if p.strip()),
+        ))
+    return targets
+
+# ----------------------------------------------------
+# Warming
+# ----------------------------------------------------
+def warm_sha(owner: str, repo: str, sha: str, paths: tuple = ()):
+    """Preload the tree, `paths` blobs and (optionally) the retrieval index for a commit."""
+    service = get_github_service()
+    entries = {e["path"]: e for e in service.get_tree_entries(owner, repo, sha)}
+    for path in paths:
+        entry = entries.get(path)
+        if entry is None or entry.get("type") != "blob":
+            debug_log("Cache warm path not in tree", context={"repo": f"{owner}/{repo}", "path": path})
+            continue
+        service.get_blob_content(owner, repo, entry["sha"])
+    if settings.cache_warm_retrieval:
+        get_index(service, owner, repo, sha)
+
+
+def warm_target(target: WarmTarget) -> str:
+    """Refresh one target; returns "unchanged" or "refreshed"."""
+    service = get_github_service()
+    branch, sha = service.resolve_sha(target.owner, target.repo, target.branch, refresh=True)
+    current = pinned_ref(target.owner, target.repo, target.branch)
+    if current and current[1] == sha:
+        return "unchanged"
+
+    warm_sha(target.owner, target.repo, sha, target.paths)
+    pin_ref(target.owner, target.repo, target.branch, branch, sha)
+    debug_log("Cache warmed", context={
+        "repo": f"{target.owner}/{target.repo}", "branch": branch, "sha": sha,
+        "previous_sha": current[1] if current else None, "paths": len(target.paths),
+    })
+    return "refreshed"
+
+
+def apply_push(owner: str, repo: str, branch: str, sha: Optional[str]) -> str:
+    """Apply a push to `branch` (sha None = branch deleted); returns "refreshed", "dropped" or "ignored"."""
+    targets = [
+        t for t in parse_targets(settings.cache_warm_targets)
+        if (t.owner, t.repo) == (owner, repo)
+        and (t.branch == branch or (pinned_ref(owner, repo, t.branch) or (None,))[0] == branch)
+    ]
+    invalidate_ref(owner, repo, branch)  # next resolve_sha re-reads the moved branch
+    if sha is None:
+        return "dropped" if repin_branch(owner, repo, branch, None) else "ignored"
+    if not targets:
+        return "ignored"  # not warmed: the ref cache entry is gone, nothing else to do
+
+    try:
+        warm_sha(owner, repo, sha, tuple(dict.fromkeys(p for t in targets for p in t.paths)))
+    except Exception as e:
+        debug_log("Webhook cache warm failed; pinning cold", e, context={"repo": f"{owner}/{repo}", "sha": sha})
+    for target in targets:
+        pin_ref(owner, repo, target.branch, branch, sha)
+    repin_branch(owner, repo, branch, sha)
+    metrics.CACHE_WARM_CHECKS.inc(result="webhook")
+    debug_log("Cache re-pinned from push webhook", context={"repo": f"{owner}/{repo}", "branch": branch, "sha": sha})
+    return "refreshed"
+
+
+def run_warm_pass(targets: Optional[List[WarmTarget]] = None) -> dict:
+    """Warm every target once; failures are logged and leave the previous pin in place."""
+    results = {}
+    for target in targets if targets is not None else parse_targets(settings.cache_warm_targets):
+        key = f"{target.owner}/{target.repo}" + (f"@{target.branch}" if target.branch else "")
+        try:
+            results[key] = warm_target(target)
+        except Exception as e:
+            debug_log("Cache warm failed", e, context={"target": key})
+            results[key] = "error"
+        metrics.CACHE_WARM_CHECKS.inc(result=results[key])
+    return results
+
+
+async def warm_loop():
+    """Background task: warm at startup, then re-check SHAs every CACHE_WARM_INTERVAL seconds."""
+    targets = parse_targets(settings.cache_warm_targets)
+    while True:
+        await asyncio.to_thread(run_warm_pass, targets)
+        await asyncio.sleep(settings.cache_warm_interval)
+
+
+if __name__ == "__main__":
+    print(run_warm_pass())